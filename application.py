@@ -1,64 +1,49 @@
-import pickle
 import streamlit as st
-import requests
 
-def fetch_poster(movie_id):
-    url = "https://api.themoviedb.org/3/movie/{}?api_key=8265bd1679663a7ea12ac168da84d2e8&language=en-US".format(movie_id)
-    data = requests.get(url)
-    data = data.json()
-    poster_path = data['poster_path']
-    full_path = "https://image.tmdb.org/t/p/w500/" + poster_path
-    return full_path
+from src.utils.artifacts import get_artifacts
+from src.utils.ranking import DEFAULT_K, recommend_ids
+from src.utils.tmdb import PLACEHOLDER_POSTER
+from src.utils.tmdb_async import fetch_movie_details_and_poster, fetch_posters, stream_posters
 
-def fetch_movie_details(movie_id):
-    # Base URL and API key
-    base_url = "https://api.themoviedb.org/3"
-    api_key = "8265bd1679663a7ea12ac168da84d2e8"
-    
-    # Fetch movie details
-    movie_url = f"{base_url}/movie/{movie_id}?api_key={api_key}"
-    movie_response = requests.get(movie_url)
-    movie_data = movie_response.json()
-    
-    # Fetch cast
-    cast_url = f"{base_url}/movie/{movie_id}/credits?api_key={api_key}"
-    cast_response = requests.get(cast_url)
-    cast_data = cast_response.json()
-    
-    # Get top 5 cast members
-    top_cast = cast_data.get('cast', [])[:5]
-    cast_names = [actor['name'] for actor in top_cast]
-    
-    return {
-        'cast': cast_names,
-        'rating': movie_data.get('vote_average', 'N/A'),
-        'release_year': movie_data.get('release_date', '')[:4],  # Get just the year
-        'vote_count': movie_data.get('vote_count', 0)
-    }
 
-def recommend(movie):
+# Titles and ids only, from local data (no network)
+def recommend_titles(movie, k=DEFAULT_K):
     try:
-        # Get the index of the movie
-        index = movies[movies['title'] == movie].index[0]
+        # Get the index of the movie (by title or, unambiguously, by movie_id)
+        index = catalog.row_for(movie)
+        if index is None:
+            raise KeyError(f"{movie!r} is not in the catalog")
         
-        # Get similarity scores and sort them
-        distances = sorted(list(enumerate(similarity[index])), reverse=True, key=lambda x: x[1])
-        
-        # Get top 20 recommendations
+        # Get top k recommendations
         recommended_movie_names = []
-        recommended_movie_posters = []
+        recommended_movie_ids = []
         
-        for i in distances[1:21]:  # Skip first movie (itself) and get next 20
-            movie_id = movies.iloc[i[0]].movie_id
-            recommended_movie_names.append(movies.iloc[i[0]].title)
-            recommended_movie_posters.append(fetch_poster(movie_id))
+        ids, _ = recommend_ids(neighbors, index, k)  # Precomputed best-first, movie itself excluded
+        for i in ids:
+            recommended_movie_names.append(catalog.titles[i])
+            recommended_movie_ids.append(int(catalog.movie_ids[i]))
             
-        return recommended_movie_names, recommended_movie_posters
+        return recommended_movie_names, recommended_movie_ids
     except Exception as e:
         st.error(f"Error in recommend function: {e}")
         return [], []
 
 
+def recommend(movie, k=DEFAULT_K):
+    recommended_movie_names, recommended_movie_ids = recommend_titles(movie, k)
+    # Posters are fetched concurrently over one keep-alive session
+    recommended_movie_posters = fetch_posters(recommended_movie_ids) if recommended_movie_ids else []
+    return recommended_movie_names, recommended_movie_posters, recommended_movie_ids
+
+
+def poster_html(poster):
+    return f"""
+                                        <div class="poster-container">
+                                            <img src="{poster}" class="poster-img">
+                                        </div>
+                                        """
+
+
 # Streamlit UI
 st.markdown(
     """
@@ -229,9 +214,8 @@ st.markdown('<div class="main-container">', unsafe_allow_html=True)
 
 st.markdown('<div class="header">Personalized Movie Recommendation System</div>', unsafe_allow_html=True)
 
-# Load movie data and similarity matrix
-movies = pickle.load(open('artifacts/movie_list.pkl', 'rb'))
-similarity = pickle.load(open('artifacts/similarity.pkl', 'rb'))
+# Load movie data and the precomputed neighbor index (once per process)
+catalog, neighbors = get_artifacts()
 
 # Initialize session states if they don't exist
 if 'selected_movie' not in st.session_state:
@@ -285,7 +269,7 @@ if st.session_state.selected_movie:
         st.markdown(f'<div class="cast-list">{cast_html}</div>', unsafe_allow_html=True)
     
     # Get new recommendations based on selected movie
-    recommended_movie_names, recommended_movie_posters = recommend(movie['title'])
+    recommended_movie_names, recommended_movie_ids = recommend_titles(movie['id'])
 
 # Search bar for movie input
 st.markdown('<div class="search-section">', unsafe_allow_html=True)
@@ -303,30 +287,24 @@ with st.container():
 if search_button:
     if selected_movie:  # Check if user has entered a movie
         try:
-            # Strip and lowercase the input for case-insensitive matching
-            selected_movie = selected_movie.strip().lower()
-            movie_titles = movies['title'].str.lower()  # Lowercase the dataset movie titles
-
-            # Find movies that contain the entered text
-            matched_movies = movies[movie_titles.str.contains(selected_movie, na=False)]
+            # Find movies whose title contains the entered text (case-insensitive),
+            # ranked exact match, then prefix, then substring
+            matched_movies = catalog.movies.iloc[catalog.search(selected_movie, 20)]
 
             if matched_movies.empty:
                 st.warning("Movie not found! Please check the spelling or try another movie.")
             else:
-                # Use the first match for recommendations
+                # Use the best match for recommendations
                 matched_movie = matched_movies.iloc[0]
                 matched_movie_title = matched_movie['title']
-                matched_movie_id = matched_movie['movie_id']
+                matched_movie_id = int(matched_movie['movie_id'])
 
-                # Fetch the poster for the selected movie
-                selected_movie_poster = fetch_poster(matched_movie_id)
+                # Fetch the details and poster for the selected movie (concurrently)
+                movie_details, selected_movie_poster = fetch_movie_details_and_poster(matched_movie_id)
 
                 # Display the selected movie
                 st.subheader("Selected Movie")
                 
-                # Fetch additional movie details
-                movie_details = fetch_movie_details(matched_movie_id)
-                
                 col1, col2 = st.columns([1, 2])
                 
                 # Display poster in the first column
@@ -369,8 +347,8 @@ if search_button:
                     ])
                     st.markdown(f'<div class="cast-list">{cast_html}</div>', unsafe_allow_html=True)
 
-                # Get recommendations
-                recommended_movie_names, recommended_movie_posters = recommend(matched_movie_title)
+                # Get recommendations (titles now, posters stream in below)
+                recommended_movie_names, recommended_movie_ids = recommend_titles(matched_movie_id)
 
                 # Handle empty recommendations
                 if not recommended_movie_names:
@@ -378,6 +356,7 @@ if search_button:
                 else:
                     st.markdown('<div class="recommendation-section">', unsafe_allow_html=True)
                     st.subheader("Recommended Movies")
+                    poster_slots = []
                     
                     # Display movies in rows with proper spacing
                     for row in range(4):  # 4 rows
@@ -389,15 +368,12 @@ if search_button:
                         for i, col in enumerate(cols):
                             idx = start_idx + i
                             if idx < len(recommended_movie_names):
-                                movie_id = movies[movies['title'] == recommended_movie_names[idx]]['movie_id'].iloc[0]
+                                movie_id = recommended_movie_ids[idx]
                                 with col:
-                                    # Display movie poster
-                                    st.markdown(
-                                        f"""
-                                        <div class="poster-container">
-                                            <img src="{recommended_movie_posters[idx]}" class="poster-img">
-                                        </div>
-                                        """,
+                                    # Poster placeholder, filled in once the poster arrives
+                                    poster_slots.append(st.empty())
+                                    poster_slots[idx].markdown(
+                                        poster_html(PLACEHOLDER_POSTER),
                                         unsafe_allow_html=True,
                                     )
                                     
@@ -409,12 +385,11 @@ if search_button:
                                     ):
                                         try:
                                             # Get movie ID and fetch all required details
-                                            movie_id = movies[movies['title'] == recommended_movie_names[idx]]['movie_id'].iloc[0]
-                                            movie_details = fetch_movie_details(movie_id)
-                                            movie_poster = fetch_poster(movie_id)
+                                            movie_id = recommended_movie_ids[idx]
+                                            movie_details, movie_poster = fetch_movie_details_and_poster(movie_id)
                                             
                                             # Get new recommendations
-                                            new_names, new_posters = recommend(recommended_movie_names[idx])
+                                            new_names, new_posters, new_ids = recommend(movie_id)
                                             
                                             # Update session state with complete movie information
                                             st.session_state.selected_movie = {
@@ -427,7 +402,8 @@ if search_button:
                                             # Store recommendations in session state
                                             st.session_state.recommendations = {
                                                 'names': new_names,
-                                                'posters': new_posters
+                                                'posters': new_posters,
+                                                'ids': new_ids
                                             }
                                             
                                             # Force a rerun to update the UI
@@ -436,6 +412,12 @@ if search_button:
                                             st.error(f"Error getting recommendations: {e}")
                         st.markdown('</div>', unsafe_allow_html=True)
                     st.markdown('</div>', unsafe_allow_html=True)
+
+                    # Fill in each poster as soon as its fetch completes
+                    stream_posters(
+                        recommended_movie_ids,
+                        lambda idx, poster: poster_slots[idx].markdown(poster_html(poster), unsafe_allow_html=True),
+                    )
         except Exception as e:
             st.error(f"An error occurred: {e}")
     else:
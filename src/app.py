@@ -1,52 +1,22 @@
-import pickle
+import math
+
 import streamlit as st
-import requests
 
-# Load data
+from src.utils.artifacts import get_artifacts
+from src.utils.ranking import DEFAULT_K, recommend_ids
+from src.utils.recommender import suggest_titles
+from src.utils.tmdb import PLACEHOLDER_POSTER
+from src.utils.tmdb_async import fetch_movie_details_and_poster, poster_stream
+
+# Recommendations shown per page; "Show more" adds another page, up to the K
+# stored in the neighbor index. Only shown posters are fetched.
+PAGE_SIZE = 10
+
+# Load data. Artifacts are loaded once per server process and shared by all
+# sessions; reruns only re-check the manifest.
 def load_data():
-    movies = pickle.load(open('artifacts/movie_list.pkl', 'rb'))
-    similarity = pickle.load(open('artifacts/similarity.pkl', 'rb'))
-    return movies, similarity
-
-# API Functions
-def fetch_poster(movie_id):
-    url = "https://api.themoviedb.org/3/movie/{}?api_key=8265bd1679663a7ea12ac168da84d2e8&language=en-US".format(movie_id)
-    data = requests.get(url)
-    data = data.json()
-    poster_path = data['poster_path']
-    full_path = "https://image.tmdb.org/t/p/w500/" + poster_path
-    return full_path
-
-def fetch_movie_details(movie_id):
-    base_url = "https://api.themoviedb.org/3"
-    api_key = "8265bd1679663a7ea12ac168da84d2e8"
-    
-    # Fetch movie details
-    movie_url = f"{base_url}/movie/{movie_id}?api_key={api_key}"
-    movie_response = requests.get(movie_url)
-    movie_data = movie_response.json()
-    
-    # Fetch cast
-    cast_url = f"{base_url}/movie/{movie_id}/credits?api_key={api_key}"
-    cast_response = requests.get(cast_url)
-    cast_data = cast_response.json()
-    
-    # Get top 5 cast members
-    top_cast = cast_data.get('cast', [])[:5]
-    cast_names = [actor['name'] for actor in top_cast]
-    
-    return {
-        'cast': cast_names,
-        'rating': movie_data.get('vote_average', 'N/A'),
-        'release_year': movie_data.get('release_date', '')[:4],
-        'vote_count': movie_data.get('vote_count', 0),
-        'overview': movie_data.get('overview', 'No overview available.'),
-        'genres': [genre['name'] for genre in movie_data.get('genres', [])],
-        'runtime': movie_data.get('runtime', 'N/A'),
-        'language': movie_data.get('original_language', 'N/A').upper(),
-        'tagline': movie_data.get('tagline', ''),
-        'status': movie_data.get('status', 'N/A')
-    }
+    catalog, neighbors = get_artifacts()
+    return catalog, neighbors
 
 
 
@@ -54,19 +24,23 @@ def fetch_movie_details(movie_id):
 
 
 # Recommendation Function
-def recommend(movie):
+# `movie` is a title or a TMDB movie_id (preferred: titles can be ambiguous).
+# Local data only: no network, so the grid can be drawn straight away.
+def recommend_titles(movie, k=DEFAULT_K):
     try:
-        index = movies[movies['title'] == movie].index[0]
-        distances = sorted(list(enumerate(similarity[index])), reverse=True, key=lambda x: x[1])
+        index = catalog.row_for(movie)
+        if index is None:
+            raise KeyError(f"{movie!r} is not in the catalog")
         recommended_movie_names = []
-        recommended_movie_posters = []
+        recommended_movie_ids = []
         
-        for i in distances[1:21]:
-            movie_id = movies.iloc[i[0]].movie_id
-            recommended_movie_names.append(movies.iloc[i[0]].title)
-            recommended_movie_posters.append(fetch_poster(movie_id))
+        # Neighbors are precomputed best-first, with the movie itself excluded
+        ids, _ = recommend_ids(neighbors, index, k)
+        for i in ids:
+            recommended_movie_names.append(catalog.titles[i])
+            recommended_movie_ids.append(int(catalog.movie_ids[i]))
             
-        return recommended_movie_names, recommended_movie_posters
+        return recommended_movie_names, recommended_movie_ids
     except Exception as e:
         st.error(f"Error in recommend function: {e}")
         return [], []
@@ -225,10 +199,23 @@ def display_movie_details(movie_title, movie_poster, movie_details):
 
 
 
-def display_recommended_movies(recommended_names, recommended_posters, prefix='rec'):
+def poster_html(movie_title, movie_poster):
+    return f"""
+                    <div class="poster-container" 
+                         onclick="handleClick('{movie_title}')" 
+                         style="cursor: pointer;">
+                        <img src="{movie_poster}" class="poster-img">
+                    </div>
+                    """
+
+
+# Posters that are not known yet (None) are drawn as placeholders; returns the
+# poster slots so that stream_recommended_posters() can fill them in later
+def display_recommended_movies(recommended_names, recommended_posters, recommended_ids, prefix='rec'):
     st.markdown('<div class="recommendation-section">', unsafe_allow_html=True)
+    poster_slots = []
     
-    for row in range(4):  # 4 rows
+    for row in range(math.ceil(len(recommended_names) / 5)):
         cols = st.columns(5)  # 5 columns
         start_idx = row * 5
         
@@ -237,14 +224,12 @@ def display_recommended_movies(recommended_names, recommended_posters, prefix='r
             if idx < len(recommended_names):
                 with col:
                     # Create clickable poster
-                    poster_html = f"""
-                    <div class="poster-container" 
-                         onclick="handleClick('{recommended_names[idx]}')" 
-                         style="cursor: pointer;">
-                        <img src="{recommended_posters[idx]}" class="poster-img">
-                    </div>
-                    """
-                    st.markdown(poster_html, unsafe_allow_html=True)
+                    poster_slot = st.empty()
+                    poster_slot.markdown(
+                        poster_html(recommended_names[idx], recommended_posters[idx] or PLACEHOLDER_POSTER),
+                        unsafe_allow_html=True
+                    )
+                    poster_slots.append(poster_slot)
                     
                     # Display movie title as button
                     if st.button(
@@ -253,30 +238,57 @@ def display_recommended_movies(recommended_names, recommended_posters, prefix='r
                         help=f"Click to see details for {recommended_names[idx]}",
                         use_container_width=True
                     ):
-                        handle_movie_click(recommended_names[idx])
+                        handle_movie_click(recommended_names[idx], recommended_ids[idx])
 
     st.markdown('</div>', unsafe_allow_html=True)
+    return poster_slots
+
+
+# Start fetching the posters missing from the placeholders left by
+# display_recommended_movies(); returns a function that fills them in as each
+# poster arrives, and remembers them so later reruns draw them right away.
+# Only the recommendations that have a slot (the shown ones) are fetched.
+# Failed or late posters are drawn as the placeholder but stay None, so the
+# next rerun asks for them again.
+def stream_recommended_posters(recommendations, poster_slots):
+    posters = recommendations['posters']
+    names = recommendations['names']
+    missing = [idx for idx, poster in enumerate(posters[:len(poster_slots)]) if poster is None]
+    arrivals = poster_stream([recommendations['ids'][idx] for idx in missing], default=None) if missing else ()
+
+    def show_posters():
+        for i, poster in arrivals:
+            idx = missing[i]
+            posters[idx] = poster
+            poster_slots[idx].markdown(poster_html(names[idx], poster or PLACEHOLDER_POSTER), unsafe_allow_html=True)
+
+    return show_posters
 
-def handle_movie_click(movie_title):
+
+def show_more(recommendations):
+    recommendations['shown'] = min(recommendations['shown'] + PAGE_SIZE, len(recommendations['ids']))
+
+def handle_movie_click(movie_title, movie_id=None):
     try:
-        # Get movie details
-        movie_id = movies[movies['title'] == movie_title]['movie_id'].iloc[0]
-        movie_details = fetch_movie_details(movie_id)
-        movie_poster = fetch_poster(movie_id)
-        
-        # Update session state
+        # Resolve the movie (the id disambiguates movies sharing a title)
+        if movie_id is None:
+            movie_id = int(catalog.movie_ids[catalog.row_for_title(movie_title)])
+        # Details and posters are fetched by main() after the page is drawn
         st.session_state.selected_movie = {
             'title': movie_title,
-            'poster': movie_poster,
+            'poster': None,
             'id': movie_id,
-            'details': movie_details
+            'details': None
         }
         
-        # Get new recommendations
-        new_names, new_posters = recommend(movie_title)
+        # Get new recommendations: every stored neighbor is a cheap local
+        # lookup, so "Show more" never has to recompute them
+        new_names, new_ids = recommend_titles(movie_id, neighbors['k'])
         st.session_state.recommendations = {
             'names': new_names,
-            'posters': new_posters
+            'posters': [None] * len(new_ids),
+            'ids': new_ids,
+            'shown': min(PAGE_SIZE, len(new_ids))
         }
         
         # Force rerun to update the UI
@@ -285,11 +297,18 @@ def handle_movie_click(movie_title):
     except Exception as e:
         st.error(f"Error handling movie click: {e}")
 
-def search_movie(query):
-    query = query.strip().lower()
-    movie_titles = movies['title'].str.lower()
-    matched_movies = movies[movie_titles.str.contains(query, na=False)]
-    return matched_movies
+def display_suggestions(suggestions):
+    for start in range(0, len(suggestions), 4):
+        cols = st.columns(4)
+        for index, col, (movie_id, title) in zip(range(start, start + 4), cols, suggestions[start:start + 4]):
+            with col:
+                # Keyed by position too: catalog rows may share a movie_id
+                if st.button(title, key=f"suggest_{index}_{movie_id}", use_container_width=True):
+                    handle_movie_click(title, movie_id)
+
+# Matching movies, best match first: exact title, then prefix, then substring
+def search_movie(query, limit=20):
+    return catalog.movies.iloc[catalog.search(query, limit)]
 
 # Main App
 def main():
@@ -431,8 +450,8 @@ def main():
     st.markdown('<div class="header"><h1>Personalized Movie Recommendation System</h1></div>', unsafe_allow_html=True)
     
     # Load data
-    global movies, similarity
-    movies, similarity = load_data()
+    global catalog, neighbors
+    catalog, neighbors = load_data()
     
     # Search section
     st.markdown('<div class="search-section">', unsafe_allow_html=True)
@@ -446,6 +465,11 @@ def main():
     with col2:
         search_button = st.button('Search')
     
+    # Autocomplete: the most popular titles starting with what has been typed
+    # (any word of the title counts); picking one selects that movie
+    if selected_movie and not search_button:
+        display_suggestions(suggest_titles(selected_movie, artifacts=(catalog, neighbors)))
+    
     # Handle search and display
     if search_button and selected_movie:
         matched_movies = search_movie(selected_movie)
@@ -454,23 +478,49 @@ def main():
             st.warning("Movie not found! Please check the spelling or try another movie.")
         else:
             matched_movie = matched_movies.iloc[0]
-            handle_movie_click(matched_movie['title'])
+            handle_movie_click(matched_movie['title'], int(matched_movie['movie_id']))
     
     # Always display selected movie details if available
     if st.session_state.get('selected_movie'):
         movie = st.session_state.selected_movie
+        recommendations = st.session_state.get('recommendations')
         
-        display_movie_details(movie['title'], movie['poster'], movie['details'])
+        # Draw everything that comes from local data first: the title, and the
+        # recommendation grid with placeholder posters
+        details_slot = st.empty()
+        if movie['details'] is None:
+            details_slot.markdown(f"<h2 style='text-align: center; color: #2c3e50;'>{movie['title']}</h2>", unsafe_allow_html=True)
+        else:
+            with details_slot.container():
+                display_movie_details(movie['title'], movie['poster'], movie['details'])
             
             # Display recommendations if available
-        if st.session_state.get('recommendations'):
+        if recommendations:
                 st.markdown("<hr style='margin: 2rem 0;'>", unsafe_allow_html=True)
                 st.subheader("You Might Also Like")
-                display_recommended_movies(
-                    st.session_state.recommendations['names'],
-                    st.session_state.recommendations['posters'],
+                shown = recommendations['shown']
+                poster_slots = display_recommended_movies(
+                    recommendations['names'][:shown],
+                    recommendations['posters'][:shown],
+                    recommendations['ids'][:shown],
                     prefix=f"rec_{movie['id']}"
                 )
+                if shown < len(recommendations['ids']):
+                    st.button("Show more", key=f"rec_{movie['id']}_more",
+                              on_click=show_more, args=(recommendations,))
+        
+        # Then fill in details and posters as they arrive from TMDB; the
+        # posters are requested before waiting on the details
+        show_posters = stream_recommended_posters(recommendations, poster_slots) if recommendations else None
+        if movie['details'] is None:
+            try:
+                movie['details'], movie['poster'] = fetch_movie_details_and_poster(movie['id'])
+                with details_slot.container():
+                    display_movie_details(movie['title'], movie['poster'], movie['details'])
+            except Exception as e:
+                st.error(f"Error fetching movie details: {e}")
+        if show_posters:
+            show_posters()
     
     st.markdown('</div>', unsafe_allow_html=True)
 
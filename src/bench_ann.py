@@ -0,0 +1,83 @@
+import argparse
+import itertools
+import random
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+
+from src.utils.ann import LSH_BAND_BITS, LSH_BITS, LSH_PROBES, LSH_RERANK, LSHIndex, build_lsh_index
+from src.utils.artifacts import ARTIFACTS_DIR, VECTOR_ARRAYS, load_arrays, load_artifacts, load_dequantized
+from src.utils.ranking import DEFAULT_K, top_k
+
+# Recall and latency of the lsh engine against the exact neighbor index, for
+# a grid of LSH settings. The signatures and buckets are rebuilt from the
+# saved tag vectors for every bits / band_bits setting; probes and rerank only
+# change the queries. The exact scan over every vector is timed as the
+# baseline the buckets avoid; `scored` is the median number of movies a query
+# scores exactly.
+#
+#   python -m src.bench_ann [--artifacts artifacts] --band-bits 8 10 --probes 128 256 512 --rerank 1000 2000
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return [latencies[int(q * (len(latencies) - 1))] * 1e3 for q in (0.5, 0.95, 0.99)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the LSH engine against the exact neighbor index")
+    parser.add_argument('--artifacts', default=ARTIFACTS_DIR, help="artifact directory (default: %(default)s)")
+    parser.add_argument('--bits', type=int, nargs='+', default=[LSH_BITS])
+    parser.add_argument('--band-bits', type=int, nargs='+', default=[LSH_BAND_BITS])
+    parser.add_argument('--probes', type=int, nargs='+', default=[LSH_PROBES])
+    parser.add_argument('--rerank', type=int, nargs='+', default=[LSH_RERANK])
+    parser.add_argument('--queries', type=int, default=300, help="seed movies queried (default: %(default)s)")
+    parser.add_argument('-k', type=int, default=DEFAULT_K, help="neighbors per query (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    _, neighbors = load_artifacts(args.artifacts, engine='neighbors')
+    arrays = dict(load_arrays(args.artifacts, VECTOR_ARRAYS),
+                  vectors_data=load_dequantized(args.artifacts, 'vectors_data'))
+    vectors = {name[len('vectors_'):]: np.asarray(arrays[name]) for name in VECTOR_ARRAYS}
+    n = len(vectors['indptr']) - 1
+    matrix = sparse.csr_matrix((vectors['data'], vectors['indices'], vectors['indptr']))
+    rows = random.Random(args.seed).sample(range(n), min(args.queries, n))
+    exact = np.asarray(neighbors['ids'][rows, :args.k])
+
+    # Baseline: score the seed against every movie
+    index = LSHIndex(vectors, build_lsh_index(matrix, 64))
+    everyone = np.arange(n)
+    latencies = []
+    for row in rows:
+        started = time.perf_counter()
+        top_k(index.similarities(row, everyone), args.k, exclude=row)
+        latencies.append(time.perf_counter() - started)
+    print(f"{n} movies, k={args.k}, {len(rows)} queries")
+    print(f"exact scan: p50/p95/p99 {'/'.join(f'{ms:.2f}' for ms in percentiles(latencies))} ms")
+
+    print(f"{'bits':>5} {'band':>4} {'probes':>6} {'rerank':>6} {'build s':>8} | {'recall':>6} {'scored':>6} | "
+          f"{'p50/p95/p99 ms':>18}")
+    for bits, band_bits in itertools.product(args.bits, args.band_bits):
+        started = time.perf_counter()
+        lsh = build_lsh_index(matrix, bits, band_bits, args.seed)
+        build = time.perf_counter() - started
+        for probes, rerank in itertools.product(args.probes, args.rerank):
+            index = LSHIndex(vectors, lsh, rerank, probes)
+            latencies = []
+            hits = 0
+            for row, truth in zip(rows, exact):
+                started = time.perf_counter()
+                ids, _ = index.neighbors([row], args.k)
+                latencies.append(time.perf_counter() - started)
+                hits += len(np.intersect1d(ids[0], truth))
+            scored = np.median([len(index.candidates(row)) for row in rows])
+            print(f"{bits:>5} {band_bits:>4} {probes:>6} {rerank:>6} {build:>8.2f} | {hits / exact.size:>6.1%} "
+                  f"{scored:>6.0f} | {'/'.join(f'{ms:.2f}' for ms in percentiles(latencies)):>18}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfTransformer
+from sklearn.preprocessing import normalize
+
+from src.build import fit_embeddings
+from src.utils.artifacts import ARTIFACTS_DIR, VECTOR_ARRAYS, load_arrays, load_artifacts, load_dequantized
+from src.utils.embeddings import EMBEDDING_DIM, EmbeddingIndex
+from src.utils.ranking import DEFAULT_K, top_k
+
+# The embeddings engine for several embedding sizes: fit time, memory, query
+# latency, and how many of a query's exact neighbors it returns, both the
+# bag-of-words ones (the stored neighbor index) and the TF-IDF ones (what the
+# SVD approximates). Embeddings are refit from the saved tag vectors for
+# every size.
+#
+#   python -m src.bench_embeddings [--artifacts artifacts] --dims 64 128 256
+
+DIMS = [64, EMBEDDING_DIM, 256]
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return [latencies[int(q * (len(latencies) - 1))] * 1e3 for q in (0.5, 0.95, 0.99)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the embeddings engine against the exact neighbor index")
+    parser.add_argument('--artifacts', default=ARTIFACTS_DIR, help="artifact directory (default: %(default)s)")
+    parser.add_argument('--dims', type=int, nargs='+', default=DIMS, help="embedding sizes (default: %(default)s)")
+    parser.add_argument('--queries', type=int, default=300, help="seed movies queried (default: %(default)s)")
+    parser.add_argument('-k', type=int, default=DEFAULT_K, help="neighbors per query (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    _, neighbors = load_artifacts(args.artifacts, engine='neighbors')
+    arrays = dict(load_arrays(args.artifacts, VECTOR_ARRAYS),
+                  vectors_data=load_dequantized(args.artifacts, 'vectors_data'))
+    vectors = sparse.csr_matrix(tuple(np.asarray(arrays[name]) for name in VECTOR_ARRAYS))
+    n = vectors.shape[0]
+    rows = random.Random(args.seed).sample(range(n), min(args.queries, n))
+    exact = np.asarray(neighbors['ids'][rows, :args.k])
+    tfidf = normalize(TfidfTransformer().fit_transform(vectors))
+    exact_tfidf, _ = top_k((tfidf[rows] @ tfidf.T).toarray(), args.k, exclude=rows)
+
+    index_mb = (neighbors['ids'].nbytes + neighbors['scores'].nbytes) / 1e6
+    vectors_mb = sum(array.nbytes for array in arrays.values()) / 1e6
+    print(f"{n} movies, k={args.k}, {len(rows)} queries; neighbor index {index_mb:.1f} MB "
+          f"(K={neighbors['k']}), sparse tag vectors {vectors_mb:.1f} MB")
+    print(f"{'dim':>4} {'fit s':>6} {'MB':>6} | {'bow overlap':>11} | {'tfidf overlap':>13} | {'p50/p95/p99 ms':>18}")
+    for dim in args.dims:
+        started = time.perf_counter()
+        embeddings, _, _ = fit_embeddings(vectors, dim, args.seed)
+        fit = time.perf_counter() - started
+        index = EmbeddingIndex(embeddings)
+
+        latencies = []
+        hits = [0, 0]
+        for row, truth, truth_tfidf in zip(rows, exact, exact_tfidf):
+            started = time.perf_counter()
+            ids, _ = index.neighbors([row], args.k)
+            latencies.append(time.perf_counter() - started)
+            hits[0] += len(np.intersect1d(ids[0], truth))
+            hits[1] += len(np.intersect1d(ids[0], truth_tfidf))
+        print(f"{dim:>4} {fit:>6.2f} {embeddings.nbytes / 1e6:>6.1f} | {hits[0] / exact.size:>11.1%} | "
+              f"{hits[1] / exact.size:>13.1%} | "
+              f"{'/'.join(f'{ms:.2f}' for ms in percentiles(latencies)):>18}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import argparse
+import ast
+import sys
+import time
+
+from src.build import DATA_DIR, director, load_movies, names, parse_row, top_cast
+
+# Parse-stage benchmark: the notebook's ast.literal_eval helpers against the
+# JSON parsing in src.build, on the same TMDB rows. Checks that both produce
+# the same fields, then reports the time per column and in total.
+#
+#   python -m src.bench_parse [--data data] [--rows 2000]
+
+
+# The notebook's helpers, kept verbatim as the baseline
+
+def convert(text):
+    L = []
+    for i in ast.literal_eval(text):
+        L.append(i['name'])
+    return L
+
+
+def convert_cast(text):
+    L = []
+    counter = 0
+    for i in ast.literal_eval(text):
+        if counter < 3:
+            L.append(i['name'])
+        counter += 1
+    return L
+
+
+def fetch_director(text):
+    L = []
+    for i in ast.literal_eval(text):
+        if i['job'] == 'Director':
+            L.append(i['name'])
+            break
+    return L
+
+
+COLUMNS = {
+    'genres': (convert, names),
+    'keywords': (convert, names),
+    'cast': (convert_cast, top_cast),
+    'crew': (fetch_director, director),
+}
+
+
+def timed(function, cells):
+    started = time.perf_counter()
+    results = [function(cell) for cell in cells]
+    return time.perf_counter() - started, results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark literal_eval against JSON parsing of the TMDB CSVs")
+    parser.add_argument('--data', default=DATA_DIR, help="directory with the TMDB CSVs (default: %(default)s)")
+    parser.add_argument('--rows', type=int, help="only parse the first ROWS movies")
+    args = parser.parse_args(argv)
+
+    movies = load_movies(args.data)
+    if args.rows:
+        movies = movies.head(args.rows)
+    print(f"{len(movies)} movies")
+    print(f"{'column':<10} {'literal_eval s':>15} {'json s':>8} {'speedup':>8}")
+
+    totals = [0.0, 0.0]
+    for column, (baseline, fast) in COLUMNS.items():
+        cells = movies[column].tolist()
+        old_time, old = timed(baseline, cells)
+        new_time, new = timed(fast, cells)
+        if old != new:
+            print(f"{column}: results differ", file=sys.stderr)
+            return 1
+        totals[0] += old_time
+        totals[1] += new_time
+        print(f"{column:<10} {old_time:>15.3f} {new_time:>8.3f} {old_time / new_time:>7.1f}x")
+    print(f"{'total':<10} {totals[0]:>15.3f} {totals[1]:>8.3f} {totals[0] / totals[1]:>7.1f}x")
+
+    # The whole per-row stage, including overview splitting and space removal
+    rows = list(movies[['overview', 'genres', 'keywords', 'cast', 'crew']].itertuples(index=False, name=None))
+    started = time.perf_counter()
+    for row in rows:
+        parse_row(*row)
+    print(f"parse_row over all columns: {time.perf_counter() - started:.3f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import argparse
+import random
+import string
+import sys
+import time
+
+from src.utils.search import Autocomplete, TitleIndex, normalize
+
+# Title search latency versus catalog size, on synthetic catalogs built from
+# a Zipf-distributed vocabulary of made-up words (or from the words of the
+# real catalog with --artifacts). Queries are catalog titles, as typed and
+# with one or two typos, timed for the ranked search and the fuzzy fallback,
+# plus autocomplete for every keystroke of typing those titles.
+#
+#   python -m src.bench_search --sizes 1000 10000 100000 --queries 500
+
+SIZES = [1000, 10000, 100000]
+QUERIES = 300
+
+
+def made_up_words(count, rng):
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 10))))
+    return sorted(words)
+
+
+def synthetic_titles(size, vocabulary, rng):
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    return [' '.join(rng.choices(vocabulary, weights, k=rng.randint(1, 5))) for _ in range(size)]
+
+
+def typo(word, rng):
+    i = rng.randrange(len(word))
+    edit = rng.choice(['delete', 'insert', 'replace', 'swap'] if len(word) > 1 else ['insert', 'replace'])
+    if edit == 'delete':
+        return word[:i] + word[i + 1:]
+    if edit == 'insert':
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i:]
+    if edit == 'replace':
+        return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+    i = min(i, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+# A title with one typo in its longest word, two if that word is long
+def misspell(title, rng):
+    words = normalize(title).split()
+    longest = max(range(len(words)), key=lambda i: len(words[i]))
+    for _ in range(1 if len(words[longest]) <= 5 else 2):
+        words[longest] = typo(words[longest], rng)
+    return ' '.join(words)
+
+
+def timings(search, queries, limit):
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        search(query, limit)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return [latencies[int(q * (len(latencies) - 1))] * 1e3 for q in (0.5, 0.95, 0.99)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark title search latency versus catalog size")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help="catalog sizes (default: %(default)s)")
+    parser.add_argument('--queries', type=int, default=QUERIES, help="queries per size (default: %(default)s)")
+    parser.add_argument('--limit', type=int, default=20, help="results per query (default: %(default)s)")
+    parser.add_argument('--artifacts', help="take the vocabulary from this artifact directory's catalog")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    if args.artifacts:
+        from src.utils.artifacts import load_artifacts
+        catalog, _ = load_artifacts(args.artifacts)
+        vocabulary = sorted({word for title in catalog.titles for word in normalize(title).split()})
+    else:
+        vocabulary = made_up_words(max(args.sizes) // 5, rng)
+
+    print(f"{'titles':>8} {'build s':>8} | {'exact p50/p95/p99 ms':>22} | {'typo p50/p95/p99 ms':>22} | found"
+          f" | {'keystroke p50/p95/p99 ms':>25}")
+    for size in args.sizes:
+        titles = synthetic_titles(size, vocabulary, rng)
+        started = time.perf_counter()
+        index = TitleIndex(titles)
+        index.spelling  # build the fuzzy structures up front, not in the first query
+        autocomplete = Autocomplete(titles, [rng.paretovariate(1) for _ in titles])
+        build = time.perf_counter() - started
+
+        targets = rng.sample(titles, min(args.queries, len(titles)))
+        typos = [misspell(title, rng) for title in targets]
+        exact = timings(index.search, targets, args.limit)
+        fuzzy = timings(index.fuzzy_matches, typos, args.limit)
+        keystrokes = [title[:n] for title in targets for n in range(1, len(title) + 1)]
+        suggest = timings(autocomplete.suggest, keystrokes, 8)
+        found = sum(normalize(title) in {index.keys[i] for _, i in index.fuzzy_matches(query, args.limit)}
+                    for title, query in zip(targets, typos))
+
+        print(f"{size:>8} {build:>8.2f} | {'/'.join(f'{ms:.2f}' for ms in exact):>22} | "
+              f"{'/'.join(f'{ms:.2f}' for ms in fuzzy):>22} | {found / len(targets):>5.0%} | "
+              f"{'/'.join(f'{ms:.3f}' for ms in suggest):>25}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
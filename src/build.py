@@ -0,0 +1,373 @@
+import argparse
+import ast
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import nltk
+import numpy as np
+import pandas as pd
+from nltk.stem import PorterStemmer
+from scipy import sparse
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+from sklearn.preprocessing import normalize
+
+from src.utils.ann import LSH_BAND_BITS, LSH_BITS, LSHIndex, build_lsh_index
+from src.utils.artifacts import (ARTIFACTS_DIR, BUILD_BLOCK_COLUMNS, BUILD_BLOCK_ROWS, NEIGHBOR_K, QUANTIZED_ARRAYS,
+                                 embedding_arrays, lsh_arrays, neighbor_index_from_vectors, quantize_arrays,
+                                 save_artifacts)
+from src.utils.embeddings import EMBEDDING_DIM, EmbeddingIndex, project
+from src.utils.quantize import QUANTIZATIONS, dequantize
+from src.utils.ranking import DEFAULT_K, top_k
+
+# Rebuild the serving artifacts from the TMDB CSVs, the same stages as
+# "Movie Recommender System Data Analysis.ipynb" run as a pipeline:
+#
+#   load -> parse (genres/keywords/cast/crew -> tags) -> stem -> vectorize
+#        -> similarity + neighbor index -> LSH signatures and buckets -> embeddings -> save
+#
+#   python -m src.build [--data data] [--out artifacts] [--workers 8]
+#
+# The per-row stages (parse, stem) are sharded across a process pool, one
+# worker per core by default. The bag of words stays sparse and the N x N
+# similarity matrix is never materialized: similarities are computed a block
+# at a time and only each movie's top-K neighbors are kept, so memory grows
+# with N x K rather than N^2. Needs scikit-learn and nltk, which serving does
+# not.
+
+DATA_DIR = 'data'
+MOVIES_CSV = 'tmdb_5000_movies.csv'
+CREDITS_CSV = 'tmdb_5000_credits.csv'
+
+# Vocabulary size of the bag of words
+MAX_FEATURES = 5000
+# Rows handed to a worker at a time
+SHARD_ROWS = 500
+# Distinct tokens handed to a worker at a time when stemming
+STEM_SHARD_TOKENS = 5000
+
+# token -> Porter stem for every token stemmed so far, kept next to the
+# artifacts so that a rebuild only stems tokens it has not seen before
+STEM_CACHE_NAME = 'stem_cache.json'
+
+ARTIFACT_COLUMNS = ['movie_id', 'title', 'tags', 'popularity']
+
+# Movies sampled by the quantization report
+REPORT_QUERIES = 200
+
+
+def load_movies(data_dir=DATA_DIR):
+    return read_movies(os.path.join(data_dir, MOVIES_CSV), os.path.join(data_dir, CREDITS_CSV))
+
+
+def read_movies(movies_path, credits_path):
+    movies = pd.read_csv(movies_path)
+    credits = pd.read_csv(credits_path)
+    movies = movies.merge(credits, on='title')
+    movies = movies[['movie_id', 'title', 'overview', 'genres', 'keywords', 'cast', 'crew', 'popularity']]
+    return movies.dropna().reset_index(drop=True)
+
+
+# Per-row parsing. The genres/keywords/cast/crew cells are JSON arrays of
+# objects; each is decoded once, and cast and crew only as far as needed: the
+# first 3 cast members, and the crew up to its first Director. Cells that are
+# not valid (or are truncated) JSON fall back to ast.literal_eval, which is
+# what the notebook used for all of them.
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r'[ \t\n\r]*')
+
+
+# The objects of a JSON array, decoded one at a time
+def iter_array(text):
+    i = _whitespace.match(text, text.index('[') + 1).end()
+    while text[i] != ']':
+        item, i = _decoder.raw_decode(text, i)
+        yield item
+        i = _whitespace.match(text, i).end()
+        if text[i] == ',':
+            i = _whitespace.match(text, i + 1).end()
+
+
+def names(text):
+    try:
+        return [i['name'] for i in json.loads(text)]
+    except ValueError:
+        return [i['name'] for i in ast.literal_eval(text)]
+
+
+# Top 3 cast
+def top_cast(text, n=3):
+    try:
+        return [i['name'] for _, i in zip(range(n), iter_array(text))]
+    except (ValueError, IndexError):
+        return [i['name'] for i in ast.literal_eval(text)[:n]]
+
+
+def first_director(members):
+    for i in members:
+        if i['job'] == 'Director':
+            return [i['name']]
+    return []
+
+
+def director(text):
+    try:
+        return first_director(iter_array(text))
+    except (ValueError, IndexError):
+        return first_director(ast.literal_eval(text))
+
+
+# 'Anna Kendrick' -> 'AnnaKendrick', so names stay one token
+def remove_space(names):
+    return [name.replace(" ", "") for name in names]
+
+
+# All derived fields of one movie in a single pass over its cells
+def parse_row(overview, genres, keywords, cast, crew):
+    return {
+        'overview': overview.split(),
+        'genres': remove_space(names(genres)),
+        'keywords': remove_space(names(keywords)),
+        'cast': remove_space(top_cast(cast)),
+        'crew': remove_space(director(crew)),
+    }
+
+
+def tags_for(overview, genres, keywords, cast, crew):
+    fields = parse_row(overview, genres, keywords, cast, crew)
+    tags = fields['overview'] + fields['genres'] + fields['keywords'] + fields['cast'] + fields['crew']
+    return " ".join(tags).lower()
+
+
+def parse_shard(rows):
+    return [tags_for(*row) for row in rows]
+
+
+_stemmer = PorterStemmer()
+# Stems from another stemmer version or mode are not reused
+STEMMER_VERSION = f"nltk-{nltk.__version__}-porter-{_stemmer.mode}"
+
+
+def load_stem_cache(path):
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache['stems'] if cache.get('stemmer') == STEMMER_VERSION else {}
+
+
+def save_stem_cache(path, stems):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'stemmer': STEMMER_VERSION, 'stems': stems}, f)
+    os.replace(tmp_path, path)
+
+
+def stem_tokens(tokens):
+    return [_stemmer.stem(token) for token in tokens]
+
+
+# Stem every token of `texts` (as the notebook's stems() did), stemming each
+# distinct token only once: unknown tokens are stemmed on the pool and added
+# to `cache`, then every text is mapped through it. Returns (texts, number of
+# tokens that had to be stemmed, number of distinct tokens in `texts`).
+def stem_texts(texts, cache, executor=None):
+    vocabulary = {token for text in texts for token in text.split()}
+    missing = sorted(vocabulary.difference(cache))
+    cache.update(zip(missing, run_sharded(stem_tokens, missing, executor, STEM_SHARD_TOKENS)))
+    return [" ".join([cache[token] for token in text.split()]) for text in texts], len(missing), len(vocabulary)
+
+
+# Apply a shard function to `items` SHARD_ROWS at a time, on the pool if
+# there is one, and concatenate the results in order
+def run_sharded(function, items, executor=None, shard_rows=SHARD_ROWS):
+    shards = [items[i:i + shard_rows] for i in range(0, len(items), shard_rows)]
+    results = executor.map(function, shards) if executor is not None else map(function, shards)
+    return [item for shard in results for item in shard]
+
+
+# TF-IDF + truncated SVD of the bag of words, for the embeddings engine.
+# Returns (embeddings (n, dim) float32, idf (features,), components (dim,
+# features)); the last two embed new movies the same way (embeddings.project).
+def fit_embeddings(vectors, dim=EMBEDDING_DIM, seed=0):
+    tfidf = TfidfTransformer().fit(vectors)
+    svd = TruncatedSVD(min(dim, vectors.shape[1] - 1), random_state=seed).fit(tfidf.transform(vectors))
+    idf = tfidf.idf_.astype(np.float32)
+    components = svd.components_.astype(np.float32)
+    return project(vectors, idf, components), idf, components
+
+
+# How much every quantization (see src.utils.quantize) changes the rankings:
+# for REPORT_QUERIES sampled movies, the share of their top-k neighbors scored
+# from the quantized tag vectors and embeddings (as the lsh and embeddings
+# engines score them, without the LSH shortlist) that float64 scoring of the
+# unquantized ones also ranks in the top-k, the largest error of the stored
+# neighbor scores, and the size of the quantized arrays.
+# Returns [{'quantization', 'bytes', 'vectors', 'embeddings', 'scores'}], with
+# None for what the artifacts do not have.
+def quantization_report(neighbors, arrays, k=DEFAULT_K, queries=REPORT_QUERIES, seed=0):
+    n = len(arrays['vectors_indptr']) - 1
+    rows = np.sort(np.random.default_rng(seed).choice(n, min(queries, n), replace=False))
+    vectors = sparse.csr_matrix((arrays['vectors_data'], arrays['vectors_indices'], arrays['vectors_indptr']),
+                                dtype=np.float64)
+    lsh = {name[len('lsh_'):]: array for name, array in arrays.items() if name.startswith('lsh_')}
+    everyone = np.arange(n)
+    baseline = {'vectors': top_k((vectors[rows] @ vectors.T).toarray(), k, exclude=rows)[0]}
+    if 'embeddings' in arrays:
+        embeddings = arrays['embeddings'].astype(np.float64)
+        baseline['embeddings'] = top_k(embeddings[rows] @ embeddings.T, k, exclude=rows)[0]
+
+    def overlap(ids, space):
+        return np.mean([len(np.intersect1d(a, b)) / k for a, b in zip(ids, baseline[space])])
+
+    floats = {name: arrays[name] for name in QUANTIZED_ARRAYS if name in arrays}
+    if 'scores' in neighbors:
+        floats['neighbor_scores'] = neighbors['scores']
+    report = []
+    for quantization in QUANTIZATIONS:
+        quantized = quantize_arrays(dict(floats, vectors_indptr=arrays['vectors_indptr']), quantization)
+        del quantized['vectors_indptr']
+        entry = {'quantization': quantization, 'bytes': sum(array.nbytes for array in quantized.values()),
+                 'vectors': None, 'embeddings': None, 'scores': None}
+
+        index = LSHIndex({'data': quantized['vectors_data'], 'indices': arrays['vectors_indices'],
+                          'indptr': arrays['vectors_indptr'], 'scales': quantized.get('vectors_data_scales')}, lsh)
+        entry['vectors'] = overlap([top_k(index.similarities(row, everyone), k, exclude=row)[0] for row in rows],
+                                   'vectors')
+        if 'embeddings' in quantized:
+            index = EmbeddingIndex(quantized['embeddings'], quantized.get('embeddings_scales'))
+            entry['embeddings'] = overlap(index.neighbors(rows, k)[0], 'embeddings')
+        if 'neighbor_scores' in quantized:
+            scores = dequantize(quantized['neighbor_scores'], quantized.get('neighbor_scores_scales'))
+            entry['scores'] = float(np.abs(scores - neighbors['scores']).max())
+        report.append(entry)
+    return report
+
+
+def print_quantization_report(report, saved, k=DEFAULT_K):
+    def percent(value):
+        return '-' if value is None else f"{value:.1%}"
+
+    print(f"top-{k} overlap with float64 scoring (* saved):")
+    print(f"{'':>10} {'MB':>7} | {'tag vectors':>11} {'embeddings':>10} | {'score error':>11}")
+    for entry in report:
+        error = '-' if entry['scores'] is None else f"{entry['scores']:.2g}"
+        name = entry['quantization'] + (' *' if entry['quantization'] == saved else '')
+        print(f"{name:>10} {entry['bytes'] / 1e6:>7.1f} | {percent(entry['vectors']):>11} "
+              f"{percent(entry['embeddings']):>10} | {error:>11}")
+
+
+# embedding_dim=0 skips the embeddings; neighbor_index=False skips the O(N^2)
+# similarity stage, leaving the lsh and embeddings engines to rank per query.
+# The float arrays are saved at `quantization`; report=True prints how every
+# quantization would change the rankings.
+def build(data_dir=DATA_DIR, out_dir=ARTIFACTS_DIR, workers=None, max_features=MAX_FEATURES, k=NEIGHBOR_K,
+          stem_cache=True, block_rows=BUILD_BLOCK_ROWS, block_columns=BUILD_BLOCK_COLUMNS, lsh_bits=LSH_BITS,
+          lsh_band_bits=LSH_BAND_BITS, embedding_dim=EMBEDDING_DIM, neighbor_index=True, quantization='float32',
+          report=True):
+    workers = workers or os.cpu_count() or 1
+    stem_cache_path = os.path.join(out_dir, STEM_CACHE_NAME)
+    timings = {}
+
+    def stage(name, started):
+        timings[name] = time.perf_counter() - started
+        print(f"{name:<10} {timings[name]:7.2f}s")
+        return time.perf_counter()
+
+    started = time.perf_counter()
+    movies = load_movies(data_dir)
+    started = stage('load', started)
+
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        rows = list(movies[['overview', 'genres', 'keywords', 'cast', 'crew']].itertuples(index=False, name=None))
+        tags = run_sharded(parse_shard, rows, executor)
+        started = stage('parse', started)
+
+        stems = load_stem_cache(stem_cache_path) if stem_cache else {}
+        tags, stemmed, distinct = stem_texts(tags, stems, executor)
+        started = stage('stem', started)
+        print(f"{'':<10} {stemmed} of {distinct} distinct tokens stemmed")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    vectorizer = CountVectorizer(max_features=max_features, stop_words='english')
+    # L2-normalized once, so cosine similarities are plain dot products
+    vectors = normalize(vectorizer.fit_transform(tags))
+    started = stage('vectorize', started)
+
+    if neighbor_index:
+        neighbors = neighbor_index_from_vectors(vectors, k, block_rows, block_columns)
+        started = stage('neighbors', started)
+    else:
+        neighbors = {'k': min(k, vectors.shape[0] - 1)}
+
+    # For the lsh engine (RECOMMENDER_ENGINE=lsh)
+    lsh = build_lsh_index(vectors, lsh_bits, lsh_band_bits)
+    arrays = lsh_arrays(vectors, lsh)
+    started = stage('lsh', started)
+
+    # For the embeddings engine (RECOMMENDER_ENGINE=embeddings)
+    if embedding_dim:
+        arrays.update(embedding_arrays(*fit_embeddings(vectors, embedding_dim)))
+        started = stage('embeddings', started)
+
+    if report:
+        quantizations = quantization_report(neighbors, arrays)
+        started = stage('report', started)
+
+    catalog = movies.assign(tags=tags)[ARTIFACT_COLUMNS]
+    manifest = save_artifacts(catalog, neighbors, out_dir, vectorizer.vocabulary_, arrays=arrays,
+                              quantization=quantization)
+    if stem_cache and stemmed:
+        save_stem_cache(stem_cache_path, stems)
+    stage('save', started)
+    if report:
+        print_quantization_report(quantizations, quantization)
+    return manifest, timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the serving artifacts from the TMDB CSVs")
+    parser.add_argument('--data', default=DATA_DIR, help="directory with the TMDB CSVs (default: %(default)s)")
+    parser.add_argument('--out', default=ARTIFACTS_DIR, help="artifact directory (default: %(default)s)")
+    parser.add_argument('--workers', type=int, help="worker processes (default: one per core)")
+    parser.add_argument('--max-features', type=int, default=MAX_FEATURES, help="vocabulary size (default: %(default)s)")
+    parser.add_argument('-k', type=int, default=NEIGHBOR_K, help="neighbors kept per movie (default: %(default)s)")
+    parser.add_argument('--no-stem-cache', action='store_true', help=f"neither read nor update {STEM_CACHE_NAME}")
+    parser.add_argument('--block-rows', type=int, default=BUILD_BLOCK_ROWS,
+                        help="movies ranked per similarity block (default: %(default)s)")
+    parser.add_argument('--block-columns', type=int, default=BUILD_BLOCK_COLUMNS,
+                        help="movies scored against per similarity block (default: %(default)s)")
+    parser.add_argument('--lsh-bits', type=int, default=LSH_BITS,
+                        help="LSH signature bits, a multiple of 64 (default: %(default)s)")
+    parser.add_argument('--lsh-band-bits', type=int, default=LSH_BAND_BITS,
+                        help="bits per LSH hash table band (default: %(default)s)")
+    parser.add_argument('--embedding-dim', type=int, default=EMBEDDING_DIM,
+                        help="TF-IDF + SVD embedding dimensions, 0 for none (default: %(default)s)")
+    parser.add_argument('--no-neighbor-index', action='store_true',
+                        help="skip the precomputed neighbor index (serve with the lsh or embeddings engine)")
+    parser.add_argument('--quantize', choices=QUANTIZATIONS, default='float32',
+                        help="storage of the neighbor scores, tag vectors and embeddings (default: %(default)s)")
+    parser.add_argument('--no-report', action='store_true', help="skip the quantization report")
+    args = parser.parse_args(argv)
+
+    manifest, timings = build(args.data, args.out, args.workers, args.max_features, args.k,
+                              stem_cache=not args.no_stem_cache, block_rows=args.block_rows,
+                              block_columns=args.block_columns, lsh_bits=args.lsh_bits,
+                              lsh_band_bits=args.lsh_band_bits, embedding_dim=args.embedding_dim,
+                              neighbor_index=not args.no_neighbor_index, quantization=args.quantize,
+                              report=not args.no_report)
+    print(f"{manifest['n_movies']} movies, k={manifest['k']} -> {args.out} in {sum(timings.values()):.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
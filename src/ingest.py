@@ -0,0 +1,122 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+from src.build import STEM_CACHE_NAME, load_stem_cache, parse_shard, read_movies, save_stem_cache, stem_texts
+from src.utils.ann import build_lsh_index
+from src.utils.artifacts import (ARTIFACTS_DIR, EMBEDDING_ARRAYS, embedding_arrays, extend_neighbor_index, load_arrays,
+                                 load_dequantized, load_manifest, load_vocabulary, lsh_arrays, save_artifacts)
+from src.utils.embeddings import project
+
+# Add new movies to existing artifacts without a full rebuild.
+#
+#   python -m src.ingest new_movies.csv new_credits.csv [--out artifacts]
+#
+# The CSVs have the layout of the TMDB ones the build reads. The new movies
+# are tagged like in the build, vectorized against the vocabulary frozen at
+# the last build, appended to the stored tag vectors of the catalog and scored
+# against the catalog only: O(new x catalog)
+# instead of the O(catalog^2) similarity. Their neighbor lists are ranked,
+# the lists of existing movies they displace a neighbor from are patched, and
+# the artifacts are saved with the next version number. The LSH signatures
+# (and their buckets) and the embeddings, if the artifacts have them, are
+# extended with the hyperplanes, bands and TF-IDF/SVD of the last build.
+# Everything is stored back at the quantization of the last build;
+# requantizing values that were already quantized gives them back unchanged,
+# so the rows an ingest does not touch do not drift.
+#
+# The vocabulary is not refit, so terms that only new movies use are ignored
+# until the next full build (python -m src.build). Movies already in the
+# catalog (by movie_id) are skipped.
+
+
+def _read_artifacts(out_dir, manifest):
+    def path(name):
+        return os.path.join(out_dir, manifest['files'][name]['path'])
+
+    catalog = pd.read_parquet(path('catalog'))
+    neighbors = {'k': manifest['k']}
+    if 'neighbor_ids' in manifest['files']:  # not when built with --no-neighbor-index
+        neighbors['ids'] = np.load(path('neighbor_ids'))
+        neighbors['scores'] = load_dequantized(out_dir, 'neighbor_scores', manifest)
+    return catalog, neighbors
+
+
+# The catalog's stored tag vectors, as a CSR matrix. Artifacts from before the
+# vectors were stored get them recomputed from the tags.
+def _read_vectors(out_dir, manifest, catalog, vocabulary):
+    if 'vectors_data' not in manifest['files']:
+        return normalize(CountVectorizer(vocabulary=vocabulary).transform(catalog['tags']))
+    arrays = load_arrays(out_dir, ['vectors_indices', 'vectors_indptr'], manifest)
+    return sparse.csr_matrix((load_dequantized(out_dir, 'vectors_data', manifest),
+                              np.asarray(arrays['vectors_indices']), np.asarray(arrays['vectors_indptr'])),
+                             shape=(len(catalog), len(vocabulary)))
+
+
+# Returns (manifest, movies added, existing neighbor lists patched)
+def ingest(new_movies, out_dir=ARTIFACTS_DIR):
+    manifest = load_manifest(out_dir)
+    vocabulary = load_vocabulary(out_dir, manifest)
+    catalog, neighbors = _read_artifacts(out_dir, manifest)
+
+    new_movies = new_movies[~new_movies['movie_id'].isin(catalog['movie_id'])]
+    new_movies = new_movies.drop_duplicates('movie_id').reset_index(drop=True)
+    if new_movies.empty:
+        return manifest, 0, 0
+
+    stem_cache_path = os.path.join(out_dir, STEM_CACHE_NAME)
+    stems = load_stem_cache(stem_cache_path)
+    rows = list(new_movies[['overview', 'genres', 'keywords', 'cast', 'crew']].itertuples(index=False, name=None))
+    tags, stemmed, _ = stem_texts(parse_shard(rows), stems)
+
+    new_vectors = normalize(CountVectorizer(vocabulary=vocabulary).transform(tags))
+    old_vectors = _read_vectors(out_dir, manifest, catalog, vocabulary)
+    vectors = sparse.vstack([old_vectors, new_vectors]).tocsr()
+
+    changed = []
+    if 'ids' in neighbors:
+        # Cosine similarity of the new movies to every movie (old ones first)
+        scores = (new_vectors @ vectors.T).toarray()
+        neighbors, changed = extend_neighbor_index(neighbors, scores)
+    arrays = {}
+    if 'lsh_planes' in manifest['files']:
+        stored = load_arrays(out_dir, ['lsh_planes', 'lsh_bucket_offsets'], manifest)
+        band_bits = (stored['lsh_bucket_offsets'].shape[1] - 1).bit_length() - 1
+        arrays.update(lsh_arrays(vectors, build_lsh_index(vectors, band_bits=band_bits,
+                                                          planes=np.array(stored['lsh_planes']))))
+    if 'embeddings' in manifest['files']:
+        _, idf, components = load_arrays(out_dir, EMBEDDING_ARRAYS, manifest).values()
+        embeddings = np.vstack([load_dequantized(out_dir, 'embeddings', manifest),
+                                project(new_vectors, idf, components)])
+        arrays.update(embedding_arrays(embeddings, np.array(idf), np.array(components)))
+    catalog = pd.concat([catalog, new_movies.assign(tags=tags)[catalog.columns]], ignore_index=True)
+    manifest = save_artifacts(catalog, neighbors, out_dir, vocabulary, manifest.get('version', 1) + 1, arrays,
+                              manifest.get('quantization', 'float32'))
+    if stemmed:
+        save_stem_cache(stem_cache_path, stems)
+    return manifest, len(new_movies), len(changed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add new movies to the artifacts without a full rebuild")
+    parser.add_argument('movies', help="CSV of new movies (TMDB movies layout)")
+    parser.add_argument('credits', help="CSV of their credits (TMDB credits layout)")
+    parser.add_argument('--out', default=ARTIFACTS_DIR, help="artifact directory (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    manifest, added, patched = ingest(read_movies(args.movies, args.credits), args.out)
+    print(f"{added} movies added, {patched} neighbor lists patched -> {args.out} version {manifest.get('version', 1)}"
+          f" ({manifest['n_movies']} movies) in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
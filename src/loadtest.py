@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from src.utils.cache import get_store
+from src.utils.mock_tmdb import start_mock_server
+from src.utils.providers import MockTMDBProvider
+from src.utils.ranking import DEFAULT_K
+from src.utils.tmdb_async import AsyncTMDBClient
+
+# Load harness for the metadata fetch path. Simulates users rendering
+# recommendation pages (details + poster of the selected movie, then K
+# posters) against the bundled mock TMDB server, or any --base-url, and
+# reports throughput and page latency percentiles.
+#
+#   python -m src.loadtest --pages 500 --users 20 --latency 0.05 --error-rate 0.01
+
+CATALOG_SIZE = 5000
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def render_page(client, rng, k):
+    movie_id, *recommended = rng.sample(range(1, CATALOG_SIZE + 1), k + 1)
+    await client.fetch_movie_details_and_poster(movie_id)
+    await client.fetch_posters(recommended)
+
+
+async def run(provider, pages, users, k, store, seed):
+    client = AsyncTMDBClient(provider, max_concurrency=users * (k + 2), store=store)
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    remaining = iter(range(pages))
+
+    async def user():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                await render_page(client, rng, k)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(users)))
+    return time.perf_counter() - started, latencies, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the metadata fetch path")
+    parser.add_argument('--base-url', help="TMDB-compatible API to hit (default: start the bundled mock)")
+    parser.add_argument('--pages', type=int, default=200, help="pages to render (default: %(default)s)")
+    parser.add_argument('--users', type=int, default=10, help="concurrent users (default: %(default)s)")
+    parser.add_argument('-k', type=int, default=DEFAULT_K, help="posters per page (default: %(default)s)")
+    parser.add_argument('--latency', type=float, default=0.05, help="mock latency in seconds (default: %(default)s)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="mock latency jitter in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="mock share of 500 answers")
+    parser.add_argument('--cache', action='store_true', help="go through the app's metadata cache")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = start_mock_server(latency=args.latency, jitter=args.jitter,
+                                   error_rate=args.error_rate, seed=args.seed)
+        base_url = server.base_url
+
+    store = get_store(MockTMDBProvider.name) if args.cache else None
+    try:
+        elapsed, latencies, errors = asyncio.run(
+            run(MockTMDBProvider(base_url), args.pages, args.users, args.k, store, args.seed)
+        )
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print(f"pages:      {len(latencies)} in {elapsed:.2f}s ({len(latencies) / elapsed:.1f} pages/s), {errors} errors")
+    if server is not None:
+        print(f"requests:   {server.requests} ({server.requests / elapsed:.1f} req/s)")
+    print("page p50:   {:.1f} ms".format(percentile(latencies, 0.50) * 1e3))
+    print("page p95:   {:.1f} ms".format(percentile(latencies, 0.95) * 1e3))
+    print("page p99:   {:.1f} ms".format(percentile(latencies, 0.99) * 1e3))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+import requests
+
+from src.utils.artifacts import ARTIFACTS_DIR, load_artifacts
+from src.utils.metadata import metadata_name, to_record, write_metadata
+from src.utils.providers import MetadataUnavailable, TMDBProvider, get_provider
+from src.utils.tmdb_async import AsyncTMDBClient, RateLimiter
+
+# Bulk-fetch TMDB details and posters for every movie in the catalog and bake
+# them into artifacts/metadata.parquet, which the app consults before TMDB
+# (other providers bake into metadata.<provider>.parquet).
+#
+#   python -m src.prefetch [--concurrency 8] [--rate 40] [--provider mock | --base-url URL]
+#
+# Every fetched movie is appended to a checkpoint file as soon as it arrives,
+# so an interrupted run picks up where it stopped.
+
+# Per provider, like the metadata artifact (see metadata.metadata_name)
+CHECKPOINT_NAME = 'metadata_checkpoint.jsonl'
+
+
+def checkpoint_name(provider='tmdb'):
+    return CHECKPOINT_NAME if provider == 'tmdb' else f'metadata_checkpoint.{provider}.jsonl'
+
+# Movies in flight at once, and TMDB requests per second across all of them
+CONCURRENCY = 8
+RATE = 40
+# Attempts per movie, with exponential backoff starting at BACKOFF seconds
+RETRIES = 3
+BACKOFF = 1.0
+
+
+def read_checkpoint(path):
+    records = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from an interrupted run
+                records[record['movie_id']] = record
+    return records
+
+
+async def fetch_record(client, movie_id):
+    for attempt in range(RETRIES):
+        try:
+            details, poster = await client.fetch_movie_details_and_poster(movie_id, default=None)
+            return to_record(movie_id, details, poster)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return to_record(movie_id, None, None)
+            error = e
+        except requests.RequestException as e:
+            error = e
+        if attempt + 1 < RETRIES:
+            await asyncio.sleep(BACKOFF * 2 ** attempt)
+    raise error
+
+
+# Returns ({movie_id: record} for every fetched movie, [movie_ids that failed])
+async def prefetch(movie_ids, checkpoint_path, provider=None, concurrency=CONCURRENCY, rate=RATE):
+    records = read_checkpoint(checkpoint_path)
+    todo = [movie_id for movie_id in dict.fromkeys(movie_ids) if movie_id not in records]
+    # A movie is two requests (details and credits)
+    client = AsyncTMDBClient(provider, max_concurrency=2 * concurrency, rate_limiter=RateLimiter(rate))
+    in_flight = asyncio.Semaphore(concurrency)
+    failed = []
+
+    with open(checkpoint_path, 'a') as checkpoint:
+        async def fetch_one(movie_id):
+            try:
+                async with in_flight:
+                    record = await fetch_record(client, movie_id)
+            except (requests.RequestException, MetadataUnavailable) as e:
+                print(f"movie {movie_id}: {e}", file=sys.stderr)
+                failed.append(movie_id)
+                return
+            except Exception as e:  # e.g. an unexpected payload: only this movie fails
+                print(f"movie {movie_id}: {type(e).__name__}: {e}", file=sys.stderr)
+                failed.append(movie_id)
+                return
+            checkpoint.write(json.dumps(record) + '\n')
+            checkpoint.flush()
+            records[movie_id] = record
+
+        await asyncio.gather(*(fetch_one(movie_id) for movie_id in todo))
+
+    return records, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bake TMDB metadata for the catalog into the artifacts")
+    parser.add_argument('--artifacts', default=ARTIFACTS_DIR, help="artifact directory (default: %(default)s)")
+    parser.add_argument('--provider', help="metadata provider (default: the configured one)")
+    parser.add_argument('--base-url', help="fetch from this TMDB-compatible API instead")
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help="movies in flight (default: %(default)s)")
+    parser.add_argument('--rate', type=float, default=RATE, help="requests per second (default: %(default)s)")
+    parser.add_argument('--fresh', action='store_true', help="ignore the checkpoint and refetch everything")
+    args = parser.parse_args(argv)
+
+    provider = TMDBProvider(args.base_url) if args.base_url else get_provider(args.provider)
+    checkpoint_path = os.path.join(args.artifacts, checkpoint_name(provider.name))
+    if args.fresh and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    catalog, _ = load_artifacts(args.artifacts)
+    movie_ids = list(dict.fromkeys(int(movie_id) for movie_id in catalog.movie_ids))
+
+    records, failed = asyncio.run(
+        prefetch(movie_ids, checkpoint_path, provider, args.concurrency, args.rate)
+    )
+    name = metadata_name(provider.name)
+    write_metadata([records[movie_id] for movie_id in movie_ids if movie_id in records],
+                   os.path.join(args.artifacts, name))
+
+    print(f"{len(movie_ids) - len(failed)}/{len(movie_ids)} movies baked into {name}")
+    if failed:
+        print(f"{len(failed)} failed; rerun to retry them", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import os
+
+import numpy as np
+
+from src.utils.ranking import top_k
+
+# Approximate nearest neighbors over the movie tag vectors, in NumPy only:
+# random-hyperplane LSH (sign random projections) with banded hash tables.
+#
+# Every movie is hashed to a signature of `bits` bits, the signs of its
+# vector against as many random hyperplanes. Two movies differ in a bit with
+# probability angle / pi. The signature is cut into bands of `band_bits` bits,
+# and each band is a hash table from its bits to the movies that share them.
+# A query looks up the seed's own bucket in every band and, multi-probe
+# style, the buckets that differ from it in the bits whose hyperplanes the
+# seed lies closest to (the ones most likely to have flipped for its
+# neighbors), up to `probes` buckets in all. Only the movies in those buckets
+# are candidates: at most the `rerank` closest of them by Hamming distance
+# between signatures are scored by exact cosine similarity.
+#
+# Knobs, recall against latency:
+#   bits      - longer signatures, more bands (build, multiple of 64)
+#   band_bits - smaller buckets, fewer candidates (build, up to 20)
+#   probes    - buckets looked up per query, at least one per band (query)
+#   rerank    - candidates scored exactly (query)
+# The query knobs can also be set with the LSH_PROBES and LSH_RERANK
+# environment variables.
+LSH_BITS = 512
+LSH_BAND_BITS = 10
+LSH_PROBES = int(os.environ.get('LSH_PROBES', 512))
+LSH_RERANK = int(os.environ.get('LSH_RERANK', 2000))
+# Probes only flip the bits of a band closest to their hyperplanes: all
+# subsets of that many bits are the probes a band can get
+LSH_PROBE_BITS = 6
+MAX_BAND_BITS = 20
+
+# Movies hashed per step while building, to bound the projection buffer
+LSH_BLOCK_ROWS = 65536
+
+
+# Tag vectors are kept as the arrays of a CSR matrix, so they can be saved as
+# .npy files and memory-mapped like the neighbor index:
+#   {'data': float32 (nnz,), 'indices': int32 (nnz,), 'indptr': int64 (n + 1,)}
+def csr_arrays(vectors):
+    vectors = vectors.tocsr()
+    return {
+        'data': vectors.data.astype(np.float32),
+        'indices': vectors.indices.astype(np.int32),
+        'indptr': vectors.indptr.astype(np.int64),
+    }
+
+
+# Hash a scipy sparse (or dense) matrix of L2-normalized rows into `bits`-bit
+# signatures, and file them in bands of `band_bits` bits. `planes` reuses the
+# hyperplanes of an existing index (src.ingest rehashes the grown catalog with
+# the same ones and band_bits).
+# Returns {'planes': (features, bits) float32,
+#          'signatures': (n, bits // 64) uint64,
+#          'bucket_offsets', 'bucket_rows': see lsh_buckets}.
+def build_lsh_index(vectors, bits=LSH_BITS, band_bits=LSH_BAND_BITS, seed=0, planes=None):
+    if planes is None:
+        if bits <= 0 or bits % 64:
+            raise ValueError(f"bits={bits} must be a positive multiple of 64")
+        rng = np.random.default_rng(seed)
+        planes = rng.standard_normal((vectors.shape[1], bits)).astype(np.float32)
+    if not 0 < band_bits <= min(planes.shape[1], MAX_BAND_BITS):
+        raise ValueError(f"band_bits={band_bits} must be between 1 and {min(planes.shape[1], MAX_BAND_BITS)}")
+
+    n = vectors.shape[0]
+    signatures = np.empty((n, planes.shape[1] // 8), dtype=np.uint8)
+    for start in range(0, n, LSH_BLOCK_ROWS):
+        stop = min(start + LSH_BLOCK_ROWS, n)
+        signatures[start:stop] = np.packbits(np.asarray(vectors[start:stop] @ planes) > 0, axis=1)
+    signatures = signatures.view(np.uint64)
+    bucket_offsets, bucket_rows = lsh_buckets(signatures, band_bits)
+    return {'planes': planes, 'signatures': signatures,
+            'bucket_offsets': bucket_offsets, 'bucket_rows': bucket_rows}
+
+
+# Signature bits in hyperplane order, (n, bits) uint8
+def _bits(signatures):
+    return np.unpackbits(np.ascontiguousarray(signatures).view(np.uint8), axis=1)
+
+
+# The bands of `signatures` as hash tables, in CSR form: band b's bucket with
+# key h (the integer of its band_bits bits) holds the movies
+# bucket_rows[b, bucket_offsets[b, h]:bucket_offsets[b, h + 1]].
+# Returns (bucket_offsets (bands, 2 ** band_bits + 1) int64,
+#          bucket_rows (bands, n) int32), bands = bits // band_bits.
+def lsh_buckets(signatures, band_bits):
+    n = len(signatures)
+    bands = signatures.shape[1] * 64 // band_bits
+    weights = 1 << np.arange(band_bits, dtype=np.int32)
+    keys = np.empty((bands, n), dtype=np.int32)
+    for start in range(0, n, LSH_BLOCK_ROWS):
+        stop = min(start + LSH_BLOCK_ROWS, n)
+        bits = _bits(signatures[start:stop])[:, :bands * band_bits]
+        keys[:, start:stop] = (bits.reshape(stop - start, bands, band_bits) @ weights).T
+
+    buckets = 1 << band_bits
+    counts = np.bincount((keys + (np.arange(bands) * buckets)[:, np.newaxis]).ravel(), minlength=bands * buckets)
+    offsets = np.zeros((bands, buckets + 1), dtype=np.int64)
+    offsets[:, 1:] = np.cumsum(counts.reshape(bands, buckets), axis=1)
+    return offsets, np.argsort(keys, axis=1, kind='stable').astype(np.int32)
+
+
+# Set bits per row (np.bitwise_count needs NumPy 2; older ones go through a
+# per-byte table)
+if hasattr(np, 'bitwise_count'):
+    def _popcount(words):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int64)
+else:
+    _BYTE_BITS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words):
+        return _BYTE_BITS[words.view(np.uint8)].sum(axis=1, dtype=np.int64)
+
+
+# Concatenation of the ranges [starts[i], stops[i]), as one index array
+def _ranges(starts, stops):
+    lengths = stops - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(lengths.sum())
+
+
+# Serving side of the LSH index: answers the same neighbor queries as the
+# precomputed index (see ranking.neighbor_rows), from the tag vectors, the
+# signatures and their buckets, all of which may be memory-mapped. The vector
+# values may be quantized (vectors['scales'] holds the per-row scales of int8
+# values); they are scored as stored and scaled afterwards.
+class LSHIndex:
+    def __init__(self, vectors, lsh, rerank=LSH_RERANK, probes=LSH_PROBES):
+        self.data = vectors['data']
+        self.indices = vectors['indices']
+        self.indptr = vectors['indptr']
+        self.scales = vectors.get('scales')
+        self.planes = lsh['planes']
+        self.n_features = self.planes.shape[0]
+        self.signatures = lsh['signatures']
+        self.bucket_offsets = lsh['bucket_offsets']
+        self.bucket_rows = lsh['bucket_rows']
+        self.bands = self.bucket_offsets.shape[0]
+        self.band_bits = (self.bucket_offsets.shape[1] - 1).bit_length() - 1
+        self.rerank = rerank
+        self.probes = max(probes, self.bands)
+
+        probe_bits = min(LSH_PROBE_BITS, self.band_bits)
+        self._subsets = (np.arange(1 << probe_bits)[:, np.newaxis] >> np.arange(probe_bits)) & 1
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    # Band and key of each bucket probed for `row`: its own bucket in every
+    # band, then the flips of its lowest-margin bits, cheapest first
+    def probe_buckets(self, row):
+        start, stop = self.indptr[row], self.indptr[row + 1]
+        values = np.asarray(self.data[start:stop], dtype=np.float32)
+        margins = np.abs(values @ self.planes[np.asarray(self.indices[start:stop])])
+        margins = margins[:self.bands * self.band_bits].reshape(self.bands, self.band_bits)
+        bits = _bits(self.signatures[row:row + 1])[0, :self.bands * self.band_bits]
+        keys = bits.reshape(self.bands, self.band_bits) @ (1 << np.arange(self.band_bits))
+
+        low = np.argsort(margins, axis=1)[:, :self._subsets.shape[1]]  # (bands, probe bits)
+        costs = np.take_along_axis(margins, low, axis=1) @ self._subsets.T  # (bands, subsets)
+        chosen = np.argsort(costs, axis=None, kind='stable')[:self.probes]
+        bands, subsets = np.divmod(chosen, len(self._subsets))
+        flips = (self._subsets[subsets] << low[bands]).sum(axis=1)
+        return bands, keys[bands] ^ flips
+
+    # The movies in `row`'s probed buckets (at most the `rerank` closest to it
+    # by Hamming distance), ascending
+    def candidates(self, row):
+        bands, keys = self.probe_buckets(row)
+        n = len(self)
+        starts = np.asarray(self.bucket_offsets[bands, keys]) + bands * n
+        stops = np.asarray(self.bucket_offsets[bands, keys + 1]) + bands * n
+        rows = np.sort(self.bucket_rows.reshape(-1)[_ranges(starts, stops)])
+        first = np.ones(len(rows), dtype=bool)  # np.unique, minus its slow hashing path
+        first[1:] = rows[1:] != rows[:-1]
+        candidates = rows[first & (rows != row)]
+        if len(candidates) > self.rerank:
+            distances = _popcount(self.signatures[candidates] ^ self.signatures[row])
+            candidates = np.sort(candidates[top_k(-distances, self.rerank)[0]])
+        return candidates
+
+    # Cosine similarity of `row` to each of `candidates` (vectors are
+    # L2-normalized, so a sparse dot product per candidate)
+    def similarities(self, row, candidates):
+        start, stop = self.indptr[row], self.indptr[row + 1]
+        query = np.zeros(self.n_features, dtype=np.float32)
+        query[np.asarray(self.indices[start:stop])] = self.data[start:stop]
+
+        starts = np.asarray(self.indptr[candidates])
+        stops = np.asarray(self.indptr[candidates + 1])
+        positions = _ranges(starts, stops)
+        products = np.asarray(self.data[positions], dtype=np.float32) * query[np.asarray(self.indices[positions])]
+        owners = np.repeat(np.arange(len(candidates)), stops - starts)
+        similarities = np.bincount(owners, weights=products, minlength=len(candidates))
+        if self.scales is not None:
+            similarities *= np.asarray(self.scales[candidates]) * self.scales[row]
+        return similarities
+
+    # (ids, scores) of shape (len(rows), k), best first. Rows with fewer than
+    # k candidates are padded with -1 ids and NaN scores.
+    def neighbors(self, rows, k):
+        rows = np.asarray(rows)
+        ids = np.full((len(rows), k), -1, dtype=np.int64)
+        scores = np.full((len(rows), k), np.nan, dtype=np.float64)
+        for i, row in enumerate(rows):
+            candidates = self.candidates(row)
+            positions, top_scores = top_k(self.similarities(row, candidates), k)
+            ids[i, :len(positions)] = candidates[positions]
+            scores[i, :len(positions)] = top_scores
+        return ids, scores
@@ -0,0 +1,381 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from src.utils.ann import LSH_PROBES, LSH_RERANK, LSHIndex, csr_arrays
+from src.utils.catalog import MovieCatalog
+from src.utils.embeddings import EmbeddingIndex
+from src.utils.quantize import QUANTIZATIONS, dequantize, quantize_csr, quantize_rows
+from src.utils.ranking import top_k
+
+# Artifact locations (relative to the repo root, like the rest of the app)
+ARTIFACTS_DIR = 'artifacts'
+MANIFEST_NAME = 'manifest.json'
+CATALOG_NAME = 'catalog.parquet'
+NEIGHBOR_IDS_NAME = 'neighbor_ids.npy'
+NEIGHBOR_SCORES_NAME = 'neighbor_scores.npy'
+VOCABULARY_NAME = 'vocabulary.json'
+
+# Bumped whenever the on-disk layout changes
+FORMAT_VERSION = 1
+
+# Number of neighbors kept per movie. The app shows 20, the rest is headroom.
+NEIGHBOR_K = 50
+
+# Similarity rows ranked per step while building the neighbor index
+BUILD_BLOCK_ROWS = 256
+# Movies scored against per step when the index is built from vectors: a step
+# holds a BUILD_BLOCK_ROWS x BUILD_BLOCK_COLUMNS similarity block, whatever
+# the catalog size
+BUILD_BLOCK_COLUMNS = 8192
+
+# How recommendations are served (RECOMMENDER_ENGINE):
+#   neighbors - read from the precomputed top-K neighbor index (exact)
+#   lsh       - approximate, queried from the tag vectors and their LSH
+#               signatures (see src.utils.ann)
+#   embeddings - ranked per query from the TF-IDF + SVD embeddings (see
+#               src.utils.embeddings); the neighbor index is not needed
+ENGINES = ['neighbors', 'lsh', 'embeddings']
+RECOMMENDER_ENGINE = os.environ.get('RECOMMENDER_ENGINE', 'neighbors')
+
+# Optional arrays saved with the artifacts (as <name>.npy) that an engine needs
+VECTOR_ARRAYS = ['vectors_data', 'vectors_indices', 'vectors_indptr']
+LSH_ARRAYS = ['lsh_planes', 'lsh_signatures', 'lsh_bucket_offsets', 'lsh_bucket_rows']
+# The fitted TF-IDF weights and SVD components are only needed to embed new
+# movies (see src.ingest)
+EMBEDDING_ARRAYS = ['embeddings', 'embedding_idf', 'embedding_components']
+ENGINE_ARRAYS = {
+    'neighbors': ['neighbor_ids', 'neighbor_scores'],
+    'lsh': VECTOR_ARRAYS + LSH_ARRAYS,
+    'embeddings': ['embeddings'],
+}
+
+# Float arrays stored at the build's quantization (see src.utils.quantize).
+# An int8 array <name> comes with its per-row scales as <name>_scales.
+QUANTIZED_ARRAYS = ['neighbor_scores', 'vectors_data', 'embeddings']
+
+# Catalog columns the serving path needs; the rest stays on disk
+SERVING_COLUMNS = ['movie_id', 'title']
+# Also loaded when present: catalogs built before they were added lack them
+OPTIONAL_SERVING_COLUMNS = ['popularity']
+
+
+# Build the top-K neighbor index from a (dense) similarity matrix.
+# ids[i] are the row positions of the K most similar movies to row i (the
+# movie itself excluded), best first; scores[i] are the matching similarities.
+# Rows are ranked a block at a time to keep the working copy small.
+def build_neighbor_index(similarity, k=NEIGHBOR_K, block_rows=BUILD_BLOCK_ROWS):
+    n = similarity.shape[0]
+    k = min(k, n - 1)
+
+    ids = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+    for start in range(0, n, block_rows):
+        stop = min(start + block_rows, n)
+        block_ids, block_scores = top_k(similarity[start:stop], k, exclude=np.arange(start, stop))
+        ids[start:stop] = block_ids
+        scores[start:stop] = block_scores
+
+    return {'ids': ids, 'scores': scores, 'k': k}
+
+
+# Build the same index straight from the movie vectors, without ever holding
+# the N x N similarity matrix. `vectors` are L2-normalized rows (a scipy sparse
+# matrix or a dense array), so a block of cosine similarities is a block of
+# dot products. Each block of rows is scored against the catalog a block of
+# columns at a time, and only its running top-K is kept between column blocks:
+# peak memory is set by the block sizes (and the vocabulary), not by N. Column blocks are merged in
+# id order, which keeps the lower-id tie-break of the full-row ranking.
+def neighbor_index_from_vectors(vectors, k=NEIGHBOR_K, block_rows=BUILD_BLOCK_ROWS,
+                                block_columns=BUILD_BLOCK_COLUMNS):
+    n = vectors.shape[0]
+    k = min(k, n - 1)
+
+    ids = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+    for start in range(0, n, block_rows):
+        stop = min(start + block_rows, n)
+        # Dense copy of the block's rows (block_rows x features): sparse x dense
+        # products are much cheaper than sparse x sparse ones that come out dense
+        rows = vectors[start:stop]
+        rows = rows.toarray() if hasattr(rows, 'toarray') else np.asarray(rows)
+        block_ids = np.empty((stop - start, 0), dtype=np.int64)
+        block_scores = np.empty((stop - start, 0), dtype=np.float64)
+        for column_start in range(0, n, block_columns):
+            column_stop = min(column_start + block_columns, n)
+            similarity = np.array((vectors[column_start:column_stop] @ rows.T).T)
+            # The movies themselves never make their own list
+            own = np.arange(max(start, column_start), min(stop, column_stop))
+            similarity[own - start, own - column_start] = -np.inf
+
+            candidates = np.hstack([block_ids, np.broadcast_to(np.arange(column_start, column_stop),
+                                                               similarity.shape)])
+            positions, block_scores = top_k(np.hstack([block_scores, similarity]), k)
+            block_ids = np.take_along_axis(candidates, positions, axis=1)
+        ids[start:stop] = block_ids
+        scores[start:stop] = block_scores
+
+    return {'ids': ids, 'scores': scores, 'k': k}
+
+
+# Add m movies to a neighbor index without rebuilding it. `scores` holds the
+# (m, n + m) similarities of the new movies to every movie, the n indexed ones
+# first. The new movies become rows n..n+m-1, ranked over all movies; an old
+# row is re-ranked only when a new movie beats its current K-th neighbor, by
+# merging its stored list with the new candidates. Ties keep the lower id, as
+# in build_neighbor_index. Returns (index, rows of the old movies that changed).
+def extend_neighbor_index(neighbors, scores):
+    ids = np.asarray(neighbors['ids'])
+    old_scores = np.asarray(neighbors['scores'])
+    n, k = ids.shape
+    m = scores.shape[0]
+    new_rows = np.arange(n, n + m)
+
+    new_ids, new_scores = top_k(scores, k, exclude=new_rows)
+
+    # (n, m): old movie -> new movies, at the stored precision so that they
+    # compare with the stored scores like they would have been stored
+    cross = scores[:, :n].T.astype(np.float32)
+    changed = np.flatnonzero((cross > old_scores[:, -1:]).any(axis=1))
+    candidates = np.hstack([ids[changed], np.broadcast_to(new_rows, (len(changed), m))])
+    positions, merged_scores = top_k(np.hstack([old_scores[changed], cross[changed]]), k)
+
+    ids = np.vstack([ids, new_ids]).astype(np.int32)
+    scores = np.vstack([old_scores, new_scores]).astype(np.float32)
+    ids[changed] = np.take_along_axis(candidates, positions, axis=1)
+    scores[changed] = merged_scores
+    return {'ids': ids, 'scores': scores, 'k': k}, changed
+
+
+# The arrays of the lsh engine, for save_artifacts: the L2-normalized tag
+# vectors (scipy sparse) and their LSH signatures (see ann.build_lsh_index)
+def lsh_arrays(vectors, lsh):
+    arrays = {'vectors_' + name: array for name, array in csr_arrays(vectors).items()}
+    arrays.update({'lsh_' + name: array for name, array in lsh.items()})
+    return arrays
+
+
+# The arrays of the embeddings engine, for save_artifacts
+def embedding_arrays(embeddings, idf, components):
+    return dict(zip(EMBEDDING_ARRAYS, [embeddings, idf, components]))
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Files are written next to their final name and swapped in with os.replace,
+# so processes that still have the old file memory-mapped keep a valid view.
+def _replace_with(path, write):
+    tmp_path = path + '.tmp'
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _save_array(path, array):
+    def write(tmp_path):
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(array))
+    _replace_with(path, write)
+
+
+# The QUANTIZED_ARRAYS of `arrays` at `quantization`, plus their scales
+def quantize_arrays(arrays, quantization):
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization {quantization!r}, expected one of {QUANTIZATIONS}")
+    arrays = dict(arrays)
+    for name in QUANTIZED_ARRAYS:
+        if name not in arrays:
+            continue
+        if name == 'vectors_data':
+            arrays[name], scales = quantize_csr(arrays[name], arrays['vectors_indptr'], quantization)
+        else:
+            arrays[name], scales = quantize_rows(arrays[name], quantization)
+        if scales is not None:
+            arrays[name + '_scales'] = scales
+    return arrays
+
+
+# `vocabulary` (token -> column of the bag of words the index was built from)
+# is only needed to ingest new movies incrementally (see src.ingest).
+# `version` counts the builds and ingests that produced this artifact set.
+# `arrays` are extra named arrays for the other engines (see ENGINE_ARRAYS).
+# `neighbors` may hold only 'k' when the engines that rank per query are the
+# only ones served; no neighbor index is saved then.
+# The float arrays are stored at `quantization` (see quantize_arrays).
+def save_artifacts(movies, neighbors, out_dir=ARTIFACTS_DIR, vocabulary=None, version=1, arrays=None,
+                   quantization='float32'):
+    os.makedirs(out_dir, exist_ok=True)
+    movies = movies.reset_index(drop=True)
+
+    arrays = dict(arrays or {})
+    if 'ids' in neighbors:
+        arrays['neighbor_ids'] = np.asarray(neighbors['ids']).astype(np.int32)
+        arrays['neighbor_scores'] = neighbors['scores']
+
+    files = {'catalog': CATALOG_NAME}
+    for name, array in quantize_arrays(arrays, quantization).items():
+        files[name] = name + '.npy'
+        _save_array(os.path.join(out_dir, files[name]), array)
+    if vocabulary is not None:
+        files['vocabulary'] = VOCABULARY_NAME
+
+        def write_vocabulary(tmp_path):
+            with open(tmp_path, 'w') as f:
+                json.dump({token: int(column) for token, column in vocabulary.items()}, f)
+        _replace_with(os.path.join(out_dir, VOCABULARY_NAME), write_vocabulary)
+    _replace_with(os.path.join(out_dir, CATALOG_NAME),
+                  lambda tmp_path: movies.to_parquet(tmp_path, index=False))
+
+    # The manifest is written last: readers only ever see complete artifact sets
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'version': version,
+        'n_movies': len(movies),
+        'k': int(neighbors['k']),
+        'quantization': quantization,
+        'files': {
+            name: {'path': filename, 'sha256': file_sha256(os.path.join(out_dir, filename))}
+            for name, filename in files.items()
+        },
+    }
+
+    def write_manifest(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+    _replace_with(os.path.join(out_dir, MANIFEST_NAME), write_manifest)
+    return manifest
+
+
+def load_manifest(out_dir=ARTIFACTS_DIR):
+    with open(os.path.join(out_dir, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version: {manifest.get('format_version')}")
+    return manifest
+
+
+def load_vocabulary(out_dir=ARTIFACTS_DIR, manifest=None):
+    manifest = manifest if manifest is not None else load_manifest(out_dir)
+    if 'vocabulary' not in manifest['files']:
+        raise ValueError(f"The artifacts in {out_dir} were saved without their vocabulary")
+    with open(os.path.join(out_dir, manifest['files']['vocabulary']['path'])) as f:
+        return json.load(f)
+
+
+# Named arrays of an artifact set, memory-mapped read-only
+def load_arrays(out_dir, names, manifest=None):
+    manifest = manifest if manifest is not None else load_manifest(out_dir)
+    missing = [name for name in names if name not in manifest['files']]
+    if missing:
+        raise ValueError(f"The artifacts in {out_dir} lack {', '.join(missing)}; rebuild them with src.build")
+    return {name: np.load(os.path.join(out_dir, manifest['files'][name]['path']), mmap_mode='r')
+            for name in names}
+
+
+# One of QUANTIZED_ARRAYS back in float32 (in memory), whatever it is stored as
+def load_dequantized(out_dir, name, manifest=None):
+    manifest = manifest if manifest is not None else load_manifest(out_dir)
+    if name + '_scales' not in manifest['files']:
+        return dequantize(load_arrays(out_dir, [name], manifest)[name])
+    arrays = load_arrays(out_dir, [name, name + '_scales'], manifest)
+    lengths = None
+    if name == 'vectors_data':
+        lengths = np.diff(load_arrays(out_dir, ['vectors_indptr'], manifest)['vectors_indptr'])
+    return dequantize(arrays[name], arrays[name + '_scales'], lengths)
+
+
+# Open the serving artifacts. The engine's arrays are memory-mapped read-only,
+# so rows are paged in on demand and the page cache is shared between workers.
+# With another `engine` than the neighbor index, the returned neighbors carry
+# it under 'engine' (see ranking.neighbor_rows); 'k' stays the stored K.
+# `rerank` and `probes` are the query knobs of the lsh engine (see
+# src.utils.ann).
+def load_artifacts(out_dir=ARTIFACTS_DIR, engine=None, rerank=LSH_RERANK, probes=LSH_PROBES):
+    engine = engine or RECOMMENDER_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown recommender engine {engine!r}, expected one of {ENGINES}")
+    manifest = load_manifest(out_dir)
+    files = manifest['files']
+
+    def path(name):
+        return os.path.join(out_dir, files[name]['path'])
+
+    available = pq.read_schema(path('catalog')).names
+    columns = SERVING_COLUMNS + [column for column in OPTIONAL_SERVING_COLUMNS if column in available]
+    catalog = MovieCatalog(pd.read_parquet(path('catalog'), columns=columns))
+
+    names = ENGINE_ARRAYS[engine]
+    arrays = load_arrays(out_dir, names + [name + '_scales' for name in names if name + '_scales' in files],
+                         manifest)
+    neighbors = {'k': manifest['k']}
+    if engine == 'neighbors':
+        neighbors['ids'] = arrays['neighbor_ids']
+        neighbors['scores'] = arrays['neighbor_scores']
+        if 'neighbor_scores_scales' in arrays:
+            neighbors['score_scales'] = arrays['neighbor_scores_scales']
+    elif engine == 'lsh':
+        vectors = {name[len('vectors_'):]: arrays[name] for name in VECTOR_ARRAYS}
+        vectors['scales'] = arrays.get('vectors_data_scales')
+        lsh = {name[len('lsh_'):]: arrays[name] for name in LSH_ARRAYS}
+        neighbors['engine'] = LSHIndex(vectors, lsh, rerank, probes)
+    else:
+        neighbors['engine'] = EmbeddingIndex(arrays['embeddings'], arrays.get('embeddings_scales'))
+    return catalog, neighbors
+
+
+# Process-wide registry of loaded artifacts, shared by every Streamlit session
+# (one entry per artifact directory and engine). The catalog's search indexes
+# are built before an entry is published, so the first query does not pay
+# for them.
+# Each lookup costs one stat() of the manifest; artifacts are only reloaded
+# when the content hashes recorded in the manifest change.
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def content_hash(manifest):
+    digest = hashlib.sha256()
+    for name in sorted(manifest['files']):
+        digest.update(name.encode())
+        digest.update(manifest['files'][name]['sha256'].encode())
+    return digest.hexdigest()
+
+
+def get_artifacts(out_dir=ARTIFACTS_DIR, engine=None):
+    stat = os.stat(os.path.join(out_dir, MANIFEST_NAME))
+    stat_key = (stat.st_mtime_ns, stat.st_size)
+    key = (out_dir, engine or RECOMMENDER_ENGINE)
+
+    entry = _registry.get(key)
+    if entry is not None and entry['stat_key'] == stat_key:
+        return entry['artifacts']
+
+    with _registry_lock:
+        entry = _registry.get(key)
+        if entry is not None and entry['stat_key'] == stat_key:
+            return entry['artifacts']
+
+        # The manifest was touched; only reload if the content actually changed
+        manifest_hash = content_hash(load_manifest(out_dir))
+        if entry is not None and entry['content_hash'] == manifest_hash:
+            entry['stat_key'] = stat_key
+            return entry['artifacts']
+
+        artifacts = load_artifacts(out_dir, key[1])
+        artifacts[0].build_search()
+        _registry[key] = {
+            'stat_key': stat_key,
+            'content_hash': manifest_hash,
+            'artifacts': artifacts,
+        }
+        return artifacts
@@ -0,0 +1,296 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from src.utils.metadata import METADATA_PATH, metadata_name, to_details
+from src.utils.providers import DATA_SOURCES, METADATA_PROVIDER
+
+# Durable TMDB metadata cache, shared by every worker process on the host.
+# Other providers (see src.utils.providers) get a file of their own, so fake
+# mock records never reach the real cache.
+CACHE_PATH = 'artifacts/tmdb_cache.sqlite'
+CACHE_PATHS = {'tmdb': CACHE_PATH}
+
+# Entry lifetimes in seconds
+DETAILS_TTL = 7 * 24 * 3600
+POSTER_TTL = 30 * 24 * 3600
+# Lifetime of "TMDB has nothing for this movie" entries (e.g. no poster_path)
+NEGATIVE_TTL = 24 * 3600
+
+# In-process hot tier: a few thousand entries cover the traffic head
+MEMORY_MAX_ENTRIES = 5000
+MEMORY_TTL = 3600
+
+# Entry kinds
+DETAILS = 'details'
+POSTER = 'poster'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    kind TEXT NOT NULL,
+    movie_id INTEGER NOT NULL,
+    value TEXT,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (kind, movie_id)
+) WITHOUT ROWID
+"""
+
+# Returned by get() on a miss, to tell it apart from a cached negative (None)
+MISS = object()
+
+
+# SQLite-backed store of JSON values keyed by (kind, movie_id), with a TTL per
+# entry. A stored value of None is a negative entry. WAL mode lets readers in
+# other processes proceed while one process writes; connections are per thread.
+# A read_only store never creates or writes the file, and misses everything
+# until someone else has.
+class MetadataStore:
+    def __init__(self, path=CACHE_PATH, read_only=False):
+        self.path = path
+        self.read_only = read_only
+        self._local = threading.local()
+        if not read_only:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection().execute(_SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.read_only:
+                conn = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True, timeout=30, isolation_level=None)
+            else:
+                conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, kind, movie_id):
+        return self.get_many(kind, [movie_id]).get(int(movie_id), MISS)
+
+    # {movie_id: value} for the live entries among movie_ids; misses are absent
+    def get_many(self, kind, movie_ids):
+        movie_ids = [int(movie_id) for movie_id in movie_ids]
+        if not movie_ids:
+            return {}
+        placeholders = ','.join('?' * len(movie_ids))
+        try:
+            rows = self._connection().execute(
+                f"SELECT movie_id, value FROM metadata "
+                f"WHERE kind = ? AND expires_at > ? AND movie_id IN ({placeholders})",
+                [kind, time.time(), *movie_ids],
+            ).fetchall()
+        except sqlite3.OperationalError:
+            if not self.read_only:
+                raise
+            return {}  # no cache written yet
+        return {movie_id: None if value is None else json.loads(value) for movie_id, value in rows}
+
+    def set(self, kind, movie_id, value, ttl):
+        self.set_many(kind, {movie_id: value}, ttl)
+
+    # None values are stored as negative entries with NEGATIVE_TTL
+    def set_many(self, kind, values, ttl):
+        now = time.time()
+        rows = [
+            (kind, int(movie_id),
+             None if value is None else json.dumps(value),
+             now + (NEGATIVE_TTL if value is None else ttl))
+            for movie_id, value in values.items()
+        ]
+        if rows:
+            self._connection().executemany(
+                "INSERT OR REPLACE INTO metadata (kind, movie_id, value, expires_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def purge_expired(self):
+        self._connection().execute("DELETE FROM metadata WHERE expires_at <= ?", (time.time(),))
+
+
+# Bounded, thread-safe LRU with a TTL per entry, shared by every Streamlit
+# session in the process. Counts hits, misses, evictions and expirations.
+class LRUCache:
+    def __init__(self, max_entries=MEMORY_MAX_ENTRIES, ttl=MEMORY_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=MISS):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    # The entry lives for the shorter of `ttl` and the cache's own TTL
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Read-only tier over the metadata artifact baked by `python -m src.prefetch`.
+# The file is re-read when it changes on disk; without it every lookup misses.
+class BakedMetadata:
+    read_only = True
+
+    def __init__(self, path=METADATA_PATH):
+        self.path = path
+        self._stat_key = None
+        self._rows = {}
+        self._records = []
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._stat_key, self._rows, self._records = None, {}, []
+            return
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        if stat_key == self._stat_key:
+            return
+        with self._lock:
+            if stat_key == self._stat_key:
+                return
+            records = pd.read_parquet(self.path).to_dict('records')
+            self._rows = {int(record['movie_id']): row for row, record in enumerate(records)}
+            self._records = records
+            self._stat_key = stat_key
+
+    def __len__(self):
+        self._refresh()
+        return len(self._records)
+
+    def get_many(self, kind, movie_ids):
+        self._refresh()
+        found = {}
+        for movie_id in movie_ids:
+            row = self._rows.get(int(movie_id))
+            if row is None:
+                continue
+            record = self._records[row]
+            if kind == POSTER:
+                poster = record['poster']  # NaN/None: TMDB has no poster
+                found[int(movie_id)] = poster if isinstance(poster, str) else None
+            elif kind == DETAILS and record['has_details']:
+                found[int(movie_id)] = to_details(record)
+        return found
+
+
+# The in-process LRU in front of slower tiers (baked artifact, durable store),
+# tried in order. Same interface as MetadataStore; hits from a slower tier are
+# promoted into memory, and writes go to every tier that is not read-only.
+class TieredStore:
+    def __init__(self, memory, *backends):
+        self.memory = memory
+        self.backends = backends
+
+    def get(self, kind, movie_id):
+        return self.get_many(kind, [movie_id]).get(int(movie_id), MISS)
+
+    def get_many(self, kind, movie_ids):
+        found = {}
+        missing = []
+        for movie_id in movie_ids:
+            movie_id = int(movie_id)
+            value = self.memory.get((kind, movie_id))
+            if value is MISS:
+                missing.append(movie_id)
+            else:
+                found[movie_id] = value
+
+        for backend in self.backends:
+            if not missing:
+                break
+            promoted = backend.get_many(kind, missing)
+            for movie_id, value in promoted.items():
+                self.memory.set((kind, movie_id), value, NEGATIVE_TTL if value is None else None)
+            found.update(promoted)
+            missing = [movie_id for movie_id in missing if movie_id not in promoted]
+        return found
+
+    def set(self, kind, movie_id, value, ttl):
+        self.set_many(kind, {movie_id: value}, ttl)
+
+    def set_many(self, kind, values, ttl):
+        for movie_id, value in values.items():
+            self.memory.set((kind, int(movie_id)), value, NEGATIVE_TTL if value is None else ttl)
+        for backend in self.backends:
+            if not getattr(backend, 'read_only', False):
+                backend.set_many(kind, values, ttl)
+
+
+_stores = {}
+_store_lock = threading.Lock()
+
+
+def cache_path(provider='tmdb'):
+    return CACHE_PATHS.get(provider, f'artifacts/tmdb_cache.{provider}.sqlite')
+
+
+# The process-wide store of a provider's metadata (by default the configured
+# provider's): its own baked artifact and cache, or read-only access to those
+# of its data source (see providers.DATA_SOURCES)
+def get_store(provider=None):
+    provider = provider or METADATA_PROVIDER
+    store = _stores.get(provider)
+    if store is None:
+        with _store_lock:
+            store = _stores.get(provider)
+            if store is None:
+                source = DATA_SOURCES.get(provider, provider)
+                baked = BakedMetadata(os.path.join(os.path.dirname(METADATA_PATH), metadata_name(source)))
+                store = TieredStore(LRUCache(), baked, MetadataStore(cache_path(source), read_only=source != provider))
+                _stores[provider] = store
+    return store
+
+
+# Hit/miss/eviction counters of the in-process tier
+def cache_stats(provider=None):
+    return get_store(provider).memory.stats()
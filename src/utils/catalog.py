@@ -0,0 +1,80 @@
+from functools import cached_property
+
+import numpy as np
+
+from src.utils.search import Autocomplete, TitleIndex
+
+
+# The movie catalog plus hash indexes built once at load time, so title and
+# movie_id lookups are O(1) instead of a boolean mask over the DataFrame.
+#
+# Titles are not unique: TMDB has several movies sharing a title, and the
+# build merges movies and credits on title, which can also repeat a movie_id.
+# title -> rows therefore keeps every row in catalog order; the single-row
+# lookups resolve to the first of them and callers that know the movie_id
+# should prefer it.
+class MovieCatalog:
+    def __init__(self, movies):
+        self.movies = movies.reset_index(drop=True)
+        self.movie_ids = self.movies['movie_id'].to_numpy()
+        self.titles = self.movies['title'].to_numpy(dtype=object)
+        # TMDB popularity, when the catalog has it (ranks autocomplete)
+        self.popularity = (self.movies['popularity'].to_numpy(dtype=np.float64)
+                           if 'popularity' in self.movies else None)
+
+        self.title_rows = {}
+        self.id_rows = {}
+        for row, (movie_id, title) in enumerate(zip(self.movie_ids.tolist(), self.titles)):
+            self.title_rows.setdefault(title, []).append(row)
+            self.id_rows.setdefault(movie_id, row)
+        self.title_rows = {title: tuple(rows) for title, rows in self.title_rows.items()}
+
+    def __len__(self):
+        return len(self.titles)
+
+    # Built on first use, or up front by build_search (the artifact registry
+    # does that at load time, so no query pays for it)
+    @cached_property
+    def search_index(self):
+        return TitleIndex(self.titles)
+
+    @cached_property
+    def autocomplete(self):
+        return Autocomplete(self.titles, self.popularity)
+
+    # Builds every search structure now, the typo-tolerant ones included
+    def build_search(self):
+        self.search_index.spelling
+        self.autocomplete
+
+    # Rows of the titles matching `query`, best match first, falling back to
+    # typo-tolerant matches when nothing matches as typed (see TitleIndex)
+    def search(self, query, limit=None, fuzzy=True):
+        return self.search_index.search(query, limit, fuzzy)
+
+    def rows_for_title(self, title):
+        return self.title_rows.get(title, ())
+
+    def row_for_title(self, title):
+        rows = self.title_rows.get(title)
+        return rows[0] if rows else None
+
+    def row_for_id(self, movie_id):
+        return self.id_rows.get(int(movie_id))
+
+    def is_ambiguous(self, title):
+        return len(self.title_rows.get(title, ())) > 1
+
+    # Titles are str, anything else is a TMDB movie_id
+    def row_for(self, title_or_id):
+        if isinstance(title_or_id, str):
+            return self.row_for_title(title_or_id)
+        return self.row_for_id(title_or_id)
+
+    # Row positions for many titles/ids at once, -1 for unknown entries
+    def rows_for(self, titles_or_ids):
+        rows = np.empty(len(titles_or_ids), dtype=np.int64)
+        for i, seed in enumerate(titles_or_ids):
+            row = self.row_for(seed)
+            rows[i] = -1 if row is None else row
+        return rows
@@ -0,0 +1,61 @@
+import numpy as np
+
+from src.utils.ranking import top_k
+
+# Dense movie embeddings: the bag of words reweighted by TF-IDF and reduced by
+# truncated SVD to EMBEDDING_DIM float32 dimensions (fitted by src.build).
+# A movie costs EMBEDDING_DIM * 4 bytes, against ~50 nonzero counts x 8 bytes
+# (plus indices) for the sparse vector and K x 8 bytes for a stored neighbor
+# list, and scoring a seed against the catalog is one (N x dim) mat-vec, cheap
+# enough to rank neighbors per query instead of storing them.
+EMBEDDING_DIM = 128
+
+# Catalog rows scored per step: quantized embeddings are widened to float32 a
+# block at a time, never all at once
+EMBEDDING_BLOCK_ROWS = 65536
+
+
+# Embeddings of bag-of-words rows (scipy sparse, counts or L2-normalized
+# counts) given the fitted IDF weights (features,) and SVD components
+# (dim, features): TF-IDF, projection, then L2 normalization, so that cosine
+# similarity is a dot product. Scaling a row before projecting does not change
+# its embedding, so the TF-IDF rows need no normalization of their own.
+def project(vectors, idf, components):
+    embeddings = np.asarray(vectors.multiply(np.asarray(idf)[np.newaxis, :]).tocsr() @ np.asarray(components).T,
+                            dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1  # movies without any known term stay all-zero
+    return np.ascontiguousarray(embeddings / norms)
+
+
+# Serving side: ranks neighbors per query from the (N, dim) embeddings, which
+# may be memory-mapped. Answers the same queries as the precomputed index
+# (see ranking.neighbor_rows), exactly, in the embedding space.
+# The embeddings may be quantized (see src.utils.quantize): float16 or int8
+# values are multiplied as stored (widened to float32 a block at a time), and
+# int8 products are scaled afterwards by the two rows' `scales`. Dot products
+# of int8 values are exact in float32 for any dim below 1000.
+class EmbeddingIndex:
+    def __init__(self, embeddings, scales=None):
+        self.embeddings = embeddings
+        self.scales = scales
+
+    def __len__(self):
+        return len(self.embeddings)
+
+    # (len(rows), N) similarities of `rows` to every movie
+    def similarities(self, rows):
+        queries = np.asarray(self.embeddings[rows], dtype=np.float32)
+        scores = np.empty((len(rows), len(self.embeddings)), dtype=np.float32)
+        for start in range(0, len(self.embeddings), EMBEDDING_BLOCK_ROWS):
+            stop = min(start + EMBEDDING_BLOCK_ROWS, len(self.embeddings))
+            scores[:, start:stop] = queries @ np.asarray(self.embeddings[start:stop], dtype=np.float32).T
+        if self.scales is not None:
+            scores *= np.asarray(self.scales[rows])[:, np.newaxis]
+            scores *= np.asarray(self.scales)[np.newaxis, :]
+        return scores
+
+    # (ids, scores) of shape (len(rows), k), best first
+    def neighbors(self, rows, k):
+        rows = np.asarray(rows)
+        return top_k(self.similarities(rows), k, exclude=rows)
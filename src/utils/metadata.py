@@ -0,0 +1,72 @@
+import math
+import os
+
+import pandas as pd
+
+# TMDB metadata baked into the artifacts by `python -m src.prefetch`. Other
+# providers (see src.utils.providers) bake into a file of their own, so mock
+# data is never served as TMDB's.
+METADATA_NAME = 'metadata.parquet'
+METADATA_PATH = os.path.join('artifacts', METADATA_NAME)
+
+
+def metadata_name(provider='tmdb'):
+    return METADATA_NAME if provider == 'tmdb' else f'metadata.{provider}.parquet'
+
+# Columns of the metadata artifact, one row per catalog movie_id
+METADATA_COLUMNS = [
+    'movie_id', 'poster', 'has_details', 'cast', 'rating', 'release_year', 'vote_count',
+    'overview', 'genres', 'runtime', 'language', 'tagline', 'status',
+]
+
+
+def _number(value):
+    return float(value) if isinstance(value, (int, float)) else math.nan
+
+
+# Flatten a fetched movie (details dict from movie_details_from, poster URL or
+# None) into one typed row. details=None means TMDB had nothing for the movie.
+def to_record(movie_id, details, poster):
+    details = details or {}
+    return {
+        'movie_id': int(movie_id),
+        'poster': poster,
+        'has_details': bool(details),
+        'cast': list(details.get('cast', [])),
+        'rating': _number(details.get('rating')),
+        'release_year': details.get('release_year', ''),
+        'vote_count': int(details.get('vote_count', 0) or 0),
+        'overview': details.get('overview', ''),
+        'genres': list(details.get('genres', [])),
+        'runtime': _number(details.get('runtime')),
+        'language': details.get('language', ''),
+        'tagline': details.get('tagline', ''),
+        'status': details.get('status', ''),
+    }
+
+
+# Inverse of to_record for the details dict the UI renders
+def to_details(record):
+    def number(value):
+        return 'N/A' if value is None or math.isnan(value) else value
+
+    runtime = number(record['runtime'])
+    return {
+        'cast': list(record['cast']),
+        'rating': number(record['rating']),
+        'release_year': record['release_year'],
+        'vote_count': int(record['vote_count']),
+        'overview': record['overview'],
+        'genres': list(record['genres']),
+        'runtime': int(runtime) if runtime != 'N/A' else runtime,
+        'language': record['language'],
+        'tagline': record['tagline'],
+        'status': record['status'],
+    }
+
+
+def write_metadata(records, path=METADATA_PATH):
+    frame = pd.DataFrame.from_records(records, columns=METADATA_COLUMNS)
+    tmp_path = path + '.tmp'
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
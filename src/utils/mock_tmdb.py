@@ -0,0 +1,148 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the TMDB API, for benchmarking and exercising the fetch
+# path offline. Answers /3/movie/{id} and /3/movie/{id}/credits with
+# TMDB-shaped JSON that is deterministic per movie_id, with configurable
+# latency and error injection.
+#
+#   python -m src.utils.mock_tmdb --port 8765 --latency 0.05 --error-rate 0.01
+#   METADATA_PROVIDER=mock streamlit run src/app.py
+
+DEFAULT_PORT = 8765
+
+_ROUTE = re.compile(r'^/3/movie/(\d+)(/credits)?$')
+_GENRES = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Drama', 'Fantasy',
+           'Horror', 'Romance', 'Science Fiction', 'Thriller']
+
+
+def movie_document(movie_id, missing_poster_rate=0.0):
+    rng = random.Random(movie_id)
+    has_poster = rng.random() >= missing_poster_rate
+    return {
+        'id': movie_id,
+        'title': f"Mock Movie {movie_id}",
+        'poster_path': f"/mock{movie_id}.jpg" if has_poster else None,
+        'vote_average': round(rng.uniform(3, 9), 1),
+        'vote_count': rng.randint(0, 20000),
+        'release_date': f"{rng.randint(1950, 2024)}-01-01",
+        'overview': f"Overview of mock movie {movie_id}.",
+        'genres': [{'id': i, 'name': name} for i, name in enumerate(rng.sample(_GENRES, 2))],
+        'runtime': rng.randint(80, 180),
+        'original_language': 'en',
+        'tagline': '',
+        'status': 'Released',
+    }
+
+
+def credits_document(movie_id):
+    return {
+        'id': movie_id,
+        'cast': [{'cast_id': i, 'name': f"Actor {movie_id}-{i}", 'order': i} for i in range(8)],
+        'crew': [{'job': 'Director', 'name': f"Director {movie_id}"}],
+    }
+
+
+class MockTMDBServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    # latency: mean seconds added to every response (uniform +/- jitter)
+    # error_rate: share of requests answered 500; not_found_rate: 404 per movie
+    def __init__(self, address, latency=0.0, jitter=0.0, error_rate=0.0,
+                 not_found_rate=0.0, missing_poster_rate=0.0, seed=None):
+        super().__init__(address, MockTMDBHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.not_found_rate = not_found_rate
+        self.missing_poster_rate = missing_poster_rate
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/3"
+
+    def draw(self):
+        with self._lock:
+            self.requests += 1
+            return self._random.random(), self._random.uniform(-self.jitter, self.jitter)
+
+
+class MockTMDBHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        roll, jitter = server.draw()
+        delay = server.latency + jitter
+        if delay > 0:
+            time.sleep(delay)
+
+        match = _ROUTE.match(self.path.split('?', 1)[0])
+        if match is None:
+            return self._send(404, {'status_message': 'The resource you requested could not be found.'})
+        movie_id = int(match.group(1))
+        if roll < server.error_rate:
+            return self._send(500, {'status_message': 'Injected error.'})
+        if random.Random(-movie_id).random() < server.not_found_rate:
+            return self._send(404, {'status_message': 'The resource you requested could not be found.'})
+        if match.group(2):
+            return self._send(200, credits_document(movie_id))
+        return self._send(200, movie_document(movie_id, server.missing_poster_rate))
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+# Start a server on a background thread; port 0 picks a free port.
+# Stop it with server.shutdown().
+def start_mock_server(host='127.0.0.1', port=0, **options):
+    server = MockTMDBServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, name='mock-tmdb', daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the TMDB API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency', type=float, default=0.0, help="mean added latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="uniform latency jitter in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered 500")
+    parser.add_argument('--not-found-rate', type=float, default=0.0, help="share of movies answered 404")
+    parser.add_argument('--missing-poster-rate', type=float, default=0.0, help="share of movies without a poster")
+    parser.add_argument('--seed', type=int, help="seed for latency and error injection")
+    args = parser.parse_args(argv)
+
+    server = MockTMDBServer(
+        (args.host, args.port), latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, not_found_rate=args.not_found_rate,
+        missing_poster_rate=args.missing_poster_rate, seed=args.seed,
+    )
+    print(f"Mock TMDB API on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from functools import partial
+
+from src.utils.tmdb import TMDB_API_KEY, TMDB_API_URL, get_executor, get_json
+
+# Backend that serves movie metadata, chosen by configuration:
+#   tmdb    - the live TMDB API (TMDB_API_URL / TMDB_API_KEY)
+#   mock    - the bundled stand-in server (python -m src.utils.mock_tmdb)
+#   offline - no network at all; only cached and baked metadata is served
+METADATA_PROVIDER = os.environ.get('METADATA_PROVIDER', 'tmdb')
+MOCK_TMDB_URL = os.environ.get('MOCK_TMDB_URL', 'http://127.0.0.1:8765/3')
+
+
+class MetadataUnavailable(LookupError):
+    pass
+
+
+# Source of TMDB-shaped JSON: movie() returns a /movie/{id} document and
+# credits() a /movie/{id}/credits document. `name` also keys the provider's
+# metadata cache (see src.utils.cache.get_store).
+class MetadataProvider(ABC):
+    name = None
+
+    @abstractmethod
+    async def movie(self, movie_id):
+        pass
+
+    @abstractmethod
+    async def credits(self, movie_id):
+        pass
+
+
+# Any TMDB-compatible HTTP API, reached over the shared keep-alive session and
+# worker pool from src.utils.tmdb
+class TMDBProvider(MetadataProvider):
+    name = 'tmdb'
+
+    def __init__(self, base_url=TMDB_API_URL, api_key=TMDB_API_KEY):
+        self.base_url = base_url
+        self.api_key = api_key
+
+    async def _get(self, path, params=None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_executor(),
+            partial(get_json, path, params, base_url=self.base_url, api_key=self.api_key),
+        )
+
+    async def movie(self, movie_id):
+        return await self._get(f"/movie/{movie_id}", {'language': 'en-US'})
+
+    async def credits(self, movie_id):
+        return await self._get(f"/movie/{movie_id}/credits")
+
+
+# The bundled mock server: TMDB-shaped but fake, so it gets its own name (and
+# cache)
+class MockTMDBProvider(TMDBProvider):
+    name = 'mock'
+
+    def __init__(self, base_url=MOCK_TMDB_URL, api_key='mock'):
+        super().__init__(base_url, api_key)
+
+
+class OfflineProvider(MetadataProvider):
+    name = 'offline'
+
+    async def movie(self, movie_id):
+        raise MetadataUnavailable(f"No metadata for movie {movie_id} (offline provider)")
+
+    async def credits(self, movie_id):
+        raise MetadataUnavailable(f"No credits for movie {movie_id} (offline provider)")
+
+
+PROVIDERS = {
+    'tmdb': TMDBProvider,
+    'mock': MockTMDBProvider,
+    'offline': OfflineProvider,
+}
+
+
+# Providers that serve the data another provider fetched: offline serves
+# what was cached and baked from TMDB, without writing to it
+DATA_SOURCES = {'offline': 'tmdb'}
+
+
+def get_provider(name=None):
+    name = name or METADATA_PROVIDER
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown metadata provider {name!r}, expected one of {sorted(PROVIDERS)}")
+    return PROVIDERS[name]()
@@ -0,0 +1,51 @@
+import numpy as np
+
+# Storage precision of the float arrays of an artifact set (the neighbor
+# scores, the tag vector values and the embeddings), chosen at build time:
+#   float32 - as computed
+#   float16 - half the size; ~3 significant digits, plenty to rank by
+#   int8    - a quarter of the size; every row is stored as int8 values plus
+#             one float32 scale (the row's largest magnitude / 127)
+# Rankings only depend on the order of the scores, so they barely move (see
+# the overlap report printed by src.build).
+QUANTIZATIONS = ['float32', 'float16', 'int8']
+
+
+# int8 scale of rows whose largest magnitude is `maxima` (all-zero rows get 1)
+def _scales(maxima):
+    return np.where(maxima > 0, maxima / 127, 1).astype(np.float32)
+
+
+# Quantize a 2-D array row by row. Returns (values, scales), scales being the
+# (rows,) float32 factors of int8 rows and None otherwise.
+def quantize_rows(array, quantization):
+    array = np.asarray(array, dtype=np.float32)
+    if quantization == 'int8':
+        scales = _scales(np.abs(array).max(axis=1, initial=0))
+        return np.round(array / scales[:, np.newaxis]).astype(np.int8), scales
+    return array.astype(quantization), None
+
+
+# Same for the values of a CSR matrix, one scale per matrix row
+def quantize_csr(data, indptr, quantization):
+    data = np.asarray(data, dtype=np.float32)
+    if quantization == 'int8':
+        lengths = np.diff(indptr)
+        maxima = np.zeros(len(lengths), dtype=np.float32)
+        rows = np.flatnonzero(lengths)
+        maxima[rows] = np.maximum.reduceat(np.abs(data), indptr[rows])
+        scales = _scales(maxima)
+        return np.round(data / np.repeat(scales, lengths)).astype(np.int8), scales
+    return data.astype(quantization), None
+
+
+# float32 values back from quantize_rows / quantize_csr output. `scales` are
+# per row of `values`, or given per element with `lengths` for CSR values.
+def dequantize(values, scales=None, lengths=None):
+    values = np.asarray(values, dtype=np.float32)
+    if scales is None:
+        return values
+    scales = np.asarray(scales)
+    if lengths is not None:
+        return values * np.repeat(scales, lengths)
+    return values * scales[:, np.newaxis]
@@ -0,0 +1,69 @@
+import numpy as np
+
+# Number of recommendations shown by the app
+DEFAULT_K = 20
+
+
+# Top-K selection over a 1-D score vector or a 2-D block of score rows.
+# Uses argpartition/partition (O(N) per row) and only sorts the K winners.
+# Ties are broken by the lower id, so results are stable across runs.
+# `exclude` is an id (1-D) or one id per row (2-D) that must never be
+# returned, typically the seed movie itself.
+# Returns (ids, scores) with the same dimensionality as the input.
+def top_k(scores, k=DEFAULT_K, exclude=None):
+    scores = np.asarray(scores)
+    if scores.ndim == 1:
+        row_exclude = None if exclude is None else [exclude]
+        ids, top_scores = top_k(scores[np.newaxis, :], k, row_exclude)
+        return ids[0], top_scores[0]
+
+    scores = scores.astype(np.float64)  # always a private copy
+    m, n = scores.shape
+    if exclude is not None:
+        scores[np.arange(m), np.asarray(exclude)] = -np.inf
+        n -= 1
+    k = max(0, min(k, n))
+    if k == 0 or m == 0:
+        return np.empty((m, k), dtype=np.int64), np.empty((m, k), dtype=np.float64)
+
+    # Score of the k-th best entry in every row
+    threshold = -np.partition(-scores, k - 1, axis=1)[:, k - 1:k]
+
+    # Everything strictly above the threshold is in; the remaining slots go to
+    # the lowest ids among the entries that tie with it.
+    above = scores > threshold
+    ties = scores == threshold
+    slots = k - above.sum(axis=1, keepdims=True)
+    selected = above | (ties & (np.cumsum(ties, axis=1) <= slots))
+
+    # np.nonzero walks row-major, so every row contributes exactly k ids in
+    # ascending order; a stable sort on score then keeps the id tie-break.
+    ids = np.nonzero(selected)[1].reshape(m, k)
+    selected_scores = np.take_along_axis(scores, ids, axis=1)
+    order = np.argsort(-selected_scores, axis=1, kind='stable')
+    return (np.take_along_axis(ids, order, axis=1),
+            np.take_along_axis(selected_scores, order, axis=1))
+
+
+# Best-first (ids, scores) arrays of shape (len(rows), k) for catalog rows.
+# With the precomputed neighbor index they are read straight from it (already
+# ranked, so no selection at query time); an index loaded with another engine
+# (see artifacts.ENGINES) has an 'engine' that answers the query instead, for
+# any k (the stored K only caps the precomputed index), and pads rows it found
+# fewer than k neighbors for with -1 ids and NaN scores.
+def neighbor_rows(neighbors, rows, k=DEFAULT_K):
+    if 'engine' in neighbors:
+        return neighbors['engine'].neighbors(rows, k)
+    if k > neighbors['k']:
+        raise ValueError(f"k={k} exceeds the {neighbors['k']} neighbors stored per movie")
+    scores = np.asarray(neighbors['scores'][rows, :k], dtype=np.float32)
+    if 'score_scales' in neighbors:  # int8 scores (see src.utils.quantize)
+        scores = scores * np.asarray(neighbors['score_scales'][rows])[:, np.newaxis]
+    return np.asarray(neighbors['ids'][rows, :k]), scores
+
+
+# Best-first (ids, scores) arrays for one catalog row
+def recommend_ids(neighbors, row, k=DEFAULT_K):
+    ids, scores = neighbor_rows(neighbors, [row], k)
+    found = ids[0] >= 0
+    return ids[0][found], scores[0][found]
@@ -0,0 +1,38 @@
+from collections import namedtuple
+
+import numpy as np
+
+from src.utils.artifacts import get_artifacts
+from src.utils.ranking import DEFAULT_K, neighbor_rows
+from src.utils.search import SUGGESTIONS
+
+# Result of a batched lookup, one row per seed (in input order).
+# found: bool per seed; rows/movie_ids/scores: (n_seeds, k) arrays, best
+# first. Seeds that are not in the catalog get -1 ids and NaN scores.
+Recommendations = namedtuple('Recommendations', ['seeds', 'found', 'rows', 'movie_ids', 'scores'])
+
+
+# Neighbors for many seed movies at once: the neighbor rows of every seed are
+# gathered in a single fancy-indexing pass over the (memory-mapped) index, or
+# queried from the engine the artifacts were loaded with (see neighbor_rows).
+# No posters or other metadata are fetched.
+def recommend_many(titles_or_ids, k=DEFAULT_K, artifacts=None):
+    catalog, neighbors = artifacts if artifacts is not None else get_artifacts()
+    seeds = list(titles_or_ids)
+    seed_rows = catalog.rows_for(seeds)
+    found = seed_rows >= 0
+
+    rows = np.full((len(seeds), k), -1, dtype=np.int64)
+    scores = np.full((len(seeds), k), np.nan, dtype=np.float32)
+    rows[found], scores[found] = neighbor_rows(neighbors, seed_rows[found], k)
+
+    movie_ids = np.where(rows >= 0, catalog.movie_ids[rows], -1)
+    return Recommendations(seeds, found, rows, movie_ids, scores)
+
+
+# [(movie_id, title)] completions for a partly typed title, most popular
+# first (see search.Autocomplete)
+def suggest_titles(prefix, limit=SUGGESTIONS, artifacts=None):
+    catalog, _ = artifacts if artifacts is not None else get_artifacts()
+    return [(int(catalog.movie_ids[row]), catalog.titles[row])
+            for row in catalog.autocomplete.suggest(prefix, limit)]
@@ -0,0 +1,306 @@
+import bisect
+import heapq
+from functools import cached_property
+
+import numpy as np
+
+# Match tiers, best first
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING, ALL_WORDS, FUZZY = range(6)
+GRAM = 3
+
+# Typo tolerance per query word: words up to 2 characters must match exactly,
+# up to 5 may be one edit off, longer ones two
+MAX_EDIT_DISTANCE = 2
+# Closest vocabulary words kept per misspelled query word
+FUZZY_CANDIDATES = 20
+
+# Suggestions returned per keystroke, and the most a caller may ask for
+SUGGESTIONS = 8
+MAX_SUGGESTIONS = 20
+# Longest stretch of the sorted terms a lookup may scan. Prefixes matching
+# more terms than this get their suggestions precomputed at build time, so a
+# keystroke never costs more than MAX_SCAN entries.
+MAX_SCAN = 2000
+
+
+def normalize(title):
+    return ' '.join(str(title).casefold().split())
+
+
+def grams(text, n=GRAM):
+    n = min(n, len(text))
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def allowed_distance(word):
+    return 0 if len(word) <= 2 else 1 if len(word) <= 5 else MAX_EDIT_DISTANCE
+
+
+# Optimal string alignment distance (Levenshtein plus adjacent
+# transpositions); gives up with max_distance + 1 once that is exceeded
+def edit_distance(a, b, max_distance):
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1,
+                             previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+# `word` with up to `distance` characters deleted, including `word` itself
+def deletes(word, distance):
+    found = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))} - found
+        found |= frontier
+    return found
+
+
+# SymSpell-style spelling index: every vocabulary word is filed under all of
+# its deletions up to max_distance, so a lookup only verifies the words that
+# share a deletion with the query (bounded by the query's own deletions)
+# instead of comparing against the whole vocabulary.
+class SymSpell:
+    def __init__(self, words, max_distance=MAX_EDIT_DISTANCE):
+        self.max_distance = max_distance
+        self.index = {}
+        for word in words:
+            for variant in deletes(word, max_distance):
+                self.index.setdefault(variant, []).append(word)
+
+    # [(distance, word)] within max_distance, closest first
+    def lookup(self, word, max_distance=None):
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        distances = {}
+        for variant in deletes(word, max_distance):
+            for candidate in self.index.get(variant, ()):
+                if candidate not in distances:
+                    distances[candidate] = edit_distance(word, candidate, max_distance)
+        return sorted((distance, candidate) for candidate, distance in distances.items()
+                      if distance <= max_distance)
+
+
+# In-memory title index built once per catalog, so a search touches only the
+# titles that can match instead of scanning the whole column:
+#   - sorted normalized titles and sorted title words, for exact, prefix and
+#     word-prefix matches by bisection;
+#   - an inverted index from 1-, 2- and 3-grams to title ids, for substring
+#     and any-order multi-word matches; candidates are the intersection of
+#     the postings of the query's grams, then verified.
+#
+# Titles are compared normalized (casefolded, whitespace collapsed). Results
+# are catalog rows ranked by tier (exact, prefix, word prefix, substring, all
+# words in any order), shorter titles first within the substring tiers.
+# Queries with no such match fall back to typo-tolerant word matching.
+class TitleIndex:
+    def __init__(self, titles):
+        self.key_rows = {}
+        for row, title in enumerate(titles):
+            self.key_rows.setdefault(normalize(title), []).append(row)
+        self.keys = list(self.key_rows)
+        self.key_ids = {key: i for i, key in enumerate(self.keys)}
+
+        self.sorted_keys = sorted(self.keys)
+        self.key_lengths = np.array([len(key) for key in self.keys], dtype=np.int32)
+        self.key_order = np.empty(len(self.keys), dtype=np.int32)
+        self.key_order[[self.key_ids[key] for key in self.sorted_keys]] = np.arange(len(self.keys))
+        self.sorted_words = sorted(
+            (word, i) for i, key in enumerate(self.keys) for word in set(key.split()[1:])
+        )
+
+        postings = {}
+        for i, key in enumerate(self.keys):
+            for n in range(1, GRAM + 1):
+                for gram in grams(key, n):
+                    postings.setdefault(gram, []).append(i)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.keys)
+
+    # The fuzzy structures are built on the first fuzzy lookup, unless built
+    # up front (see MovieCatalog.build_search)
+    @cached_property
+    def word_titles(self):
+        word_titles = {}
+        for i, key in enumerate(self.keys):
+            for word in set(key.split()):
+                word_titles.setdefault(word, []).append(i)
+        return {word: np.array(ids, dtype=np.int32) for word, ids in word_titles.items()}
+
+    @cached_property
+    def spelling(self):
+        return SymSpell(self.word_titles)
+
+    def _candidates(self, words):
+        lists = sorted((self.postings.get(gram) for word in words for gram in grams(word)),
+                       key=lambda ids: -1 if ids is None else len(ids))
+        if not lists or lists[0] is None:
+            return np.empty(0, dtype=np.int32)
+        ids = lists[0]
+        for other in lists[1:]:
+            ids = np.intersect1d(ids, other, assume_unique=True)
+            if not len(ids):
+                break
+        return ids
+
+    # Ranked (tier, key id) matches, stopping once `limit` titles are found
+    def matches(self, query, limit=None):
+        query = normalize(query)
+        if not query:
+            return []
+        found = {}
+
+        def full():
+            return limit is not None and len(found) >= limit
+
+        if query in self.key_ids:
+            found[self.key_ids[query]] = EXACT
+
+        for j in range(bisect.bisect_left(self.sorted_keys, query), len(self.sorted_keys)):
+            key = self.sorted_keys[j]
+            if full() or not key.startswith(query):
+                break
+            found.setdefault(self.key_ids[key], PREFIX)
+
+        for j in range(bisect.bisect_left(self.sorted_words, (query,)), len(self.sorted_words)):
+            word, i = self.sorted_words[j]
+            if full() or not word.startswith(query):
+                break
+            found.setdefault(i, WORD_PREFIX)
+
+        words = query.split()
+        if not full():
+            def rest():
+                for i in self._candidates(words).tolist():
+                    if i not in found:
+                        key = self.keys[i]
+                        if query in key:
+                            yield SUBSTRING, len(key), key, i
+                        elif len(words) > 1 and all(word in key for word in words):
+                            yield ALL_WORDS, len(key), key, i
+
+            # Only the best `limit` of them are ever sorted
+            best = sorted(rest()) if limit is None else heapq.nsmallest(limit - len(found), rest())
+            for tier, _, _, i in best:
+                found[i] = tier
+
+        ranked = sorted(found.items(), key=lambda item: item[1])  # stable: keeps title order per tier
+        return [(tier, i) for i, tier in ranked][:limit]
+
+    # Titles containing, for every query word, a word within that word's
+    # allowed edit distance. Ranked by total distance, then by how close the
+    # title's length is to the query's.
+    def fuzzy_matches(self, query, limit=None):
+        query = normalize(query)
+        words = query.split()
+        if not words:
+            return []
+
+        ids = distances = None  # matching title ids (sorted) and summed distances
+        for word in set(words):
+            closest = self.spelling.lookup(word, allowed_distance(word))[:FUZZY_CANDIDATES]
+            if not closest:
+                return []
+            word_ids, word_distances = self._titles_near(closest)
+            if ids is None:
+                ids, distances = word_ids, word_distances
+            else:
+                ids, mine, theirs = np.intersect1d(ids, word_ids, assume_unique=True, return_indices=True)
+                distances = distances[mine] + word_distances[theirs]
+
+        order = np.lexsort((self.key_order[ids], np.abs(self.key_lengths[ids] - len(query)), distances))
+        return [(FUZZY, i) for i in ids[order[:limit]].tolist()]
+
+    # Sorted ids of the titles containing any of the (distance, word)
+    # candidates, each with the smallest distance among its words
+    def _titles_near(self, closest):
+        ids = np.concatenate([self.word_titles[word] for _, word in closest])
+        distances = np.concatenate([np.full(len(self.word_titles[word]), distance) for distance, word in closest])
+        order = np.lexsort((distances, ids))
+        ids, distances = ids[order], distances[order]
+        first = np.ones(len(ids), dtype=bool)
+        first[1:] = ids[1:] != ids[:-1]
+        return ids[first], distances[first]
+
+    # Catalog rows for the best matches; titles shared by several movies
+    # contribute all their rows, in catalog order
+    def search(self, query, limit=None, fuzzy=True):
+        matches = self.matches(query, limit)
+        if not matches and fuzzy:
+            matches = self.fuzzy_matches(query, limit)
+        rows = []
+        for _, i in matches:
+            rows.extend(self.key_rows[self.keys[i]])
+        return rows
+
+
+# Prefix completion over normalized titles, most popular movies first.
+#
+# Every title is filed in one sorted array under each of its word suffixes
+# ("the dark knight", "dark knight", "knight"), so typing any leading part of
+# any word of a title finds it. A prefix selects a contiguous range of that
+# array by bisection; short, busy prefixes ("t", "th", "the") are answered
+# from lists precomputed at build time, all others by ranking their (at most
+# MAX_SCAN) entries by popularity. Ties go to the catalog order.
+class Autocomplete:
+    def __init__(self, titles, popularity=None):
+        entries = sorted(
+            (' '.join(words[start:]), row)
+            for row, title in enumerate(titles)
+            for words in [normalize(title).split()]
+            for start in range(len(words))
+        )
+        self.terms = [term for term, _ in entries]
+        self.term_rows = np.array([row for _, row in entries], dtype=np.int64)
+        self.popularity = (np.zeros(len(titles)) if popularity is None
+                           else np.nan_to_num(np.asarray(popularity, dtype=np.float64)))
+        self.precomputed = {}
+        self._precompute('', 0, len(self.terms))
+
+    def _range(self, prefix):
+        lo = bisect.bisect_left(self.terms, prefix)
+        hi = bisect.bisect_left(self.terms, prefix + '\U0010ffff', lo)
+        return lo, hi
+
+    # Catalog rows in terms[lo:hi], most popular first
+    def _rank(self, lo, hi, limit):
+        rows = np.unique(self.term_rows[lo:hi])  # also sorts, for the catalog-order tie-break
+        order = np.argsort(-self.popularity[rows], kind='stable')
+        return rows[order[:limit]].tolist()
+
+    # Precompute `prefix` and, recursively, every longer prefix whose range
+    # is still too wide to scan per keystroke
+    def _precompute(self, prefix, lo, hi):
+        self.precomputed[prefix] = self._rank(lo, hi, MAX_SUGGESTIONS)
+        depth = len(prefix)
+        i = lo
+        while i < hi:
+            if len(self.terms[i]) <= depth:
+                i += 1
+                continue
+            child = self.terms[i][:depth + 1]
+            end = bisect.bisect_left(self.terms, child + '\U0010ffff', i, hi)
+            if end - i > MAX_SCAN:
+                self._precompute(child, i, end)
+            i = end
+
+    # Catalog rows of the best completions of `prefix`
+    def suggest(self, prefix, limit=SUGGESTIONS):
+        prefix = normalize(prefix)
+        limit = min(limit, MAX_SUGGESTIONS)
+        if not prefix:
+            return []
+        if prefix in self.precomputed:
+            return self.precomputed[prefix][:limit]
+        lo, hi = self._range(prefix)
+        return self._rank(lo, hi, limit)
@@ -0,0 +1,88 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+TMDB_API_URL = os.environ.get('TMDB_API_URL', "https://api.themoviedb.org/3")
+TMDB_API_KEY = os.environ.get('TMDB_API_KEY', "8265bd1679663a7ea12ac168da84d2e8")
+POSTER_BASE_URL = "https://image.tmdb.org/t/p/w500/"
+
+# Shown when a poster is missing, failed or did not arrive in time
+PLACEHOLDER_POSTER = (
+    "data:image/svg+xml;utf8,"
+    "<svg xmlns='http://www.w3.org/2000/svg' width='500' height='750'>"
+    "<rect width='100%25' height='100%25' fill='%23e9ecef'/></svg>"
+)
+
+# Concurrent TMDB requests per process (the global limit: every client shares
+# this pool); also the keep-alive connection pool size
+MAX_WORKERS = 20
+# Per-request (connect, read) timeout in seconds
+REQUEST_TIMEOUT = (3.05, 5)
+
+_session = None
+_executor = None
+_lock = threading.Lock()
+
+
+# One keep-alive session per process, shared by all Streamlit sessions, so
+# repeated calls reuse TCP/TLS connections instead of opening new ones
+def get_session():
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='tmdb')
+    return _executor
+
+
+def get_json(path, params=None, base_url=TMDB_API_URL, api_key=TMDB_API_KEY, timeout=REQUEST_TIMEOUT):
+    response = get_session().get(
+        f"{base_url}{path}",
+        params={'api_key': api_key, **(params or {})},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def poster_url(movie_data):
+    poster_path = movie_data['poster_path']
+    full_path = POSTER_BASE_URL + poster_path
+    return full_path
+
+
+# Shape the /movie/{id} and /movie/{id}/credits responses into the details
+# dict the UI renders
+def movie_details_from(movie_data, cast_data):
+    # Get top 5 cast members
+    top_cast = cast_data.get('cast', [])[:5]
+    cast_names = [actor['name'] for actor in top_cast]
+
+    return {
+        'cast': cast_names,
+        'rating': movie_data.get('vote_average', 'N/A'),
+        'release_year': movie_data.get('release_date', '')[:4],
+        'vote_count': movie_data.get('vote_count', 0),
+        'overview': movie_data.get('overview', 'No overview available.'),
+        'genres': [genre['name'] for genre in movie_data.get('genres', [])],
+        'runtime': movie_data.get('runtime', 'N/A'),
+        'language': movie_data.get('original_language', 'N/A').upper(),
+        'tagline': movie_data.get('tagline', ''),
+        'status': movie_data.get('status', 'N/A')
+    }
@@ -0,0 +1,264 @@
+import asyncio
+import os
+import queue
+import threading
+
+from src.utils.cache import DETAILS, DETAILS_TTL, MISS, POSTER, POSTER_TTL, get_store
+from src.utils.providers import get_provider
+from src.utils.tmdb import PLACEHOLDER_POSTER, movie_details_from, poster_url
+
+# In-flight requests allowed per client. The sync facades share one client per
+# provider, and every client draws from the pool in src.utils.tmdb.
+MAX_CONCURRENCY = 20
+# Upper bound on the wall time of a whole poster batch, in seconds
+BATCH_TIMEOUT = 8
+# Requests per second the sync facades send to one provider, across all
+# sessions (0 = unlimited). Up to RATE_BURST requests (a page of posters) go
+# out at once; only sustained traffic beyond that is spaced out.
+RATE_LIMIT = float(os.environ.get('TMDB_RATE_LIMIT', 40))
+RATE_BURST = MAX_CONCURRENCY
+
+
+# Token bucket of `burst` tokens refilled at `rate` per second, shared by all
+# coroutines using it: bursts of up to `burst` requests pass at once, beyond
+# that requests are spaced 1/rate seconds apart. With burst=1 every request is.
+class RateLimiter:
+    def __init__(self, rate, burst=1):
+        self.interval = 1.0 / rate
+        self.tolerance = (burst - 1) * self.interval
+        self._next_slot = 0.0  # the bucket is full again from this time on
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next_slot - self.tolerance)
+        self._next_slot = max(now, self._next_slot) + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+# asyncio client for movie metadata. The raw TMDB-shaped documents come from a
+# MetadataProvider (see src.utils.providers), by default the configured one;
+# the HTTP providers run on the shared keep-alive session and worker pool, so
+# async callers and the sync facades below share connections and the global
+# concurrency limit.
+#
+# With a `store` (see src.utils.cache) results are looked up there first and
+# written back after a fetch. Store calls block (SQLite), so they run in the
+# loop's default executor rather than on the event loop shared by every caller. Posters are None when TMDB has no poster_path;
+# that is cached too, so such movies are not asked for again until it expires.
+# An optional RateLimiter spaces out the requests this client sends.
+class AsyncTMDBClient:
+    def __init__(self, provider=None, max_concurrency=MAX_CONCURRENCY, store=None, rate_limiter=None):
+        self.provider = provider if provider is not None else get_provider()
+        self.store = store
+        self.rate_limiter = rate_limiter
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _call(self, fetch, movie_id):
+        if self.rate_limiter is not None:
+            await self.rate_limiter.wait()
+        async with self._semaphore:
+            return await fetch(movie_id)
+
+    async def get_movie(self, movie_id):
+        return await self._call(self.provider.movie, movie_id)
+
+    async def get_credits(self, movie_id):
+        return await self._call(self.provider.credits, movie_id)
+
+    async def _in_executor(self, method, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, getattr(self.store, method), *args)
+
+    async def _cached(self, kind, movie_id):
+        return MISS if self.store is None else await self._in_executor('get', kind, movie_id)
+
+    async def _cached_many(self, kind, movie_ids):
+        return {} if self.store is None else await self._in_executor('get_many', kind, movie_ids)
+
+    async def _remember(self, kind, values, ttl):
+        if self.store is not None and values:
+            await self._in_executor('set_many', kind, values, ttl)
+
+    async def _fetch_poster(self, movie_id):
+        movie_data = await self.get_movie(movie_id)
+        return poster_url(movie_data) if movie_data.get('poster_path') else None
+
+    async def fetch_poster(self, movie_id):
+        poster = await self._cached(POSTER, movie_id)
+        if poster is MISS:
+            poster = await self._fetch_poster(movie_id)
+            await self._remember(POSTER, {movie_id: poster}, POSTER_TTL)
+        return poster
+
+    # Details and credits are requested concurrently: one round trip of latency
+    async def fetch_movie_details(self, movie_id):
+        details = await self._cached(DETAILS, movie_id)
+        if details is MISS:
+            movie_data, cast_data = await asyncio.gather(
+                self.get_movie(movie_id),
+                self.get_credits(movie_id),
+            )
+            details = movie_details_from(movie_data, cast_data)
+            await self._remember(DETAILS, {movie_id: details}, DETAILS_TTL)
+        return details
+
+    # Details plus the poster URL, reusing the /movie/{id} response for both
+    async def fetch_movie_details_and_poster(self, movie_id, default=PLACEHOLDER_POSTER):
+        details, poster = await asyncio.gather(self._cached(DETAILS, movie_id), self._cached(POSTER, movie_id))
+        if details is MISS:
+            movie_data, cast_data = await asyncio.gather(
+                self.get_movie(movie_id),
+                self.get_credits(movie_id),
+            )
+            details = movie_details_from(movie_data, cast_data)
+            poster = poster_url(movie_data) if movie_data.get('poster_path') else None
+            await asyncio.gather(
+                self._remember(DETAILS, {movie_id: details}, DETAILS_TTL),
+                self._remember(POSTER, {movie_id: poster}, POSTER_TTL),
+            )
+        elif poster is MISS:
+            poster = await self.fetch_poster(movie_id)
+        return details, poster or default
+
+    # Posters in input order; missing posters, failures and stragglers past
+    # `timeout` get `default`. Cached posters are served in one store lookup.
+    async def fetch_posters(self, movie_ids, timeout=BATCH_TIMEOUT, default=PLACEHOLDER_POSTER):
+        posters = [default] * len(movie_ids)
+
+        def collect(index, poster):
+            posters[index] = poster
+
+        await self.stream_posters(movie_ids, collect, timeout, default)
+        return posters
+
+    # Calls on_poster(index, poster) for every position of movie_ids as soon as
+    # its poster is known: cached ones first, the rest in completion order.
+    # Every position is reported exactly once; failures and stragglers past
+    # `timeout` get `default`.
+    async def stream_posters(self, movie_ids, on_poster, timeout=BATCH_TIMEOUT, default=PLACEHOLDER_POSTER):
+        positions = {}
+        for index, movie_id in enumerate(movie_ids):
+            positions.setdefault(int(movie_id), []).append(index)
+
+        def report(movie_id, poster):
+            for index in positions[movie_id]:
+                on_poster(index, poster or default)
+
+        cached = await self._cached_many(POSTER, list(positions))
+        for movie_id, poster in cached.items():
+            report(movie_id, poster)
+        missing = [movie_id for movie_id in positions if movie_id not in cached]
+        if not missing:
+            return
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        tasks = {asyncio.ensure_future(self._fetch_poster(movie_id)): movie_id for movie_id in missing}
+        pending = set(tasks)
+        fetched = {}
+        try:
+            while pending and loop.time() < deadline:
+                done, pending = await asyncio.wait(
+                    pending, timeout=deadline - loop.time(), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    movie_id = tasks[task]
+                    if task.exception() is None:
+                        fetched[movie_id] = task.result()
+                    report(movie_id, fetched.get(movie_id))
+        finally:
+            for task in pending:
+                task.cancel()
+            await self._remember(POSTER, fetched, POSTER_TTL)
+        for task in pending:
+            report(tasks[task], None)
+
+
+# Sync facades for the Streamlit app and batch scripts, backed by the shared
+# cache (in-process LRU over the on-disk store). Every call runs on one
+# background event loop per process, through one client per provider, so all
+# sessions share that client's concurrency limit and rate limiter. They must
+# not be called from that loop.
+_loop = None
+_clients = {}
+_facade_lock = threading.Lock()
+
+
+def _get_loop():
+    global _loop
+    if _loop is None:
+        with _facade_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='tmdb-async', daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+# The process-wide client of a provider (by default the configured one), keyed
+# by provider name and endpoint, so providers pointed at different servers do
+# not share a client
+def get_client(provider=None):
+    provider = provider if provider is not None else get_provider()
+    key = (provider.name, getattr(provider, 'base_url', None))
+    with _facade_lock:
+        client = _clients.get(key)
+        if client is None:
+            rate_limiter = RateLimiter(RATE_LIMIT, RATE_BURST) if RATE_LIMIT > 0 else None
+            client = AsyncTMDBClient(provider, store=get_store(provider.name), rate_limiter=rate_limiter)
+            _clients[key] = client
+    return client
+
+
+def _run(method, *args, provider=None, **kwargs):
+    coroutine = getattr(get_client(provider), method)(*args, **kwargs)
+    return asyncio.run_coroutine_threadsafe(coroutine, _get_loop()).result()
+
+
+def fetch_poster(movie_id, provider=None, default=PLACEHOLDER_POSTER):
+    return _run('fetch_poster', movie_id, provider=provider) or default
+
+
+def fetch_movie_details(movie_id, provider=None):
+    return _run('fetch_movie_details', movie_id, provider=provider)
+
+
+def fetch_movie_details_and_poster(movie_id, provider=None):
+    return _run('fetch_movie_details_and_poster', movie_id, provider=provider)
+
+
+def fetch_posters(movie_ids, provider=None, timeout=BATCH_TIMEOUT, default=PLACEHOLDER_POSTER):
+    return _run('fetch_posters', list(movie_ids), timeout=timeout, default=default, provider=provider)
+
+
+# Starts streaming posters (see AsyncTMDBClient.stream_posters) and returns an
+# iterator of (index, poster) in arrival order, to be consumed on the calling
+# thread. The fetches run meanwhile, so the caller can do other work (say,
+# wait on the details of a movie) before draining it.
+def poster_stream(movie_ids, provider=None, timeout=BATCH_TIMEOUT, default=PLACEHOLDER_POSTER):
+    reported = queue.SimpleQueue()
+    finished = object()
+
+    async def stream():
+        try:
+            await get_client(provider).stream_posters(
+                list(movie_ids), lambda index, poster: reported.put((index, poster)), timeout, default
+            )
+        finally:
+            reported.put(finished)
+
+    future = asyncio.run_coroutine_threadsafe(stream(), _get_loop())
+
+    def arrivals():
+        yield from iter(reported.get, finished)
+        future.result()
+
+    return arrivals()
+
+
+# on_poster runs on the calling thread (the posters are handed over from the
+# event loop through a queue), so it may update the UI directly
+def stream_posters(movie_ids, on_poster, provider=None, timeout=BATCH_TIMEOUT, default=PLACEHOLDER_POSTER):
+    for index, poster in poster_stream(movie_ids, provider, timeout, default):
+        on_poster(index, poster)
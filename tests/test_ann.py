@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from scipy import sparse
+
+from src.utils.ann import LSHIndex, _bits, build_lsh_index, csr_arrays
+from src.utils.ranking import top_k
+
+
+# Sparse L2-normalized rows, like the tag vectors
+def tag_vectors(n=400, features=300, seed=0):
+    vectors = sparse.random(n, features, density=0.05, random_state=seed, format='csr')
+    vectors.data[:] = 1
+    norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1))).ravel()
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(vectors.multiply(1 / norms[:, np.newaxis]))
+
+
+@pytest.fixture(scope='module')
+def vectors():
+    return tag_vectors()
+
+
+@pytest.fixture(scope='module')
+def lsh(vectors):
+    return build_lsh_index(vectors, bits=128, band_bits=8)
+
+
+def test_bits_must_fill_whole_words(vectors):
+    with pytest.raises(ValueError):
+        build_lsh_index(vectors, bits=100)
+    with pytest.raises(ValueError):
+        build_lsh_index(vectors, bits=64, band_bits=65)
+
+
+# Every band files every movie exactly once, under the key of its band bits
+def test_buckets_partition_the_catalog(vectors, lsh):
+    offsets, rows = lsh['bucket_offsets'], lsh['bucket_rows']
+    assert offsets.shape == (16, 2 ** 8 + 1)
+    bits = _bits(lsh['signatures'])
+    for band in range(len(offsets)):
+        assert sorted(rows[band]) == list(range(vectors.shape[0]))
+        keys = bits[:, band * 8:(band + 1) * 8] @ (1 << np.arange(8))
+        for key in range(2 ** 8):
+            bucket = rows[band, offsets[band, key]:offsets[band, key + 1]]
+            assert (keys[bucket] == key).all()
+
+
+def test_same_hyperplanes_same_signatures(vectors, lsh):
+    rebuilt = build_lsh_index(vectors[:50], band_bits=8, planes=lsh['planes'])
+    np.testing.assert_array_equal(rebuilt['signatures'], lsh['signatures'][:50])
+
+
+def test_candidates_are_distinct_and_leave_the_seed_out(vectors, lsh):
+    index = LSHIndex(csr_arrays(vectors), lsh, rerank=50, probes=64)
+    for row in range(0, vectors.shape[0], 37):
+        candidates = index.candidates(row)
+        assert len(candidates) <= 50
+        assert row not in candidates
+        assert (np.diff(candidates) > 0).all()
+
+
+# With every bucket probed (band_bits no more than the probed bits) and every
+# candidate reranked, the answer is exact
+def test_exhaustive_settings_match_the_exact_scan(vectors):
+    lsh = build_lsh_index(vectors, bits=128, band_bits=6)
+    index = LSHIndex(csr_arrays(vectors), lsh, rerank=vectors.shape[0], probes=21 * 2 ** 6)
+    rows = np.arange(0, vectors.shape[0], 13)
+    ids, scores = index.neighbors(rows, 10)
+    expected_ids, expected_scores = top_k((vectors[rows] @ vectors.T).toarray(), 10, exclude=rows)
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
+    assert (ids == expected_ids).all()
+
+
+# A copy of a movie shares its buckets and signature, so even the fewest
+# probes and a tiny rerank find it
+def test_copies_are_found_first(vectors):
+    n = vectors.shape[0]
+    doubled = sparse.vstack([vectors, vectors[:20]]).tocsr()
+    index = LSHIndex(csr_arrays(doubled), build_lsh_index(doubled, bits=128, band_bits=8), rerank=5, probes=1)
+    ids, scores = index.neighbors(np.arange(20), 1)
+    assert ids[:, 0].tolist() == list(range(n, n + 20))
+    np.testing.assert_allclose(scores[:, 0], 1, rtol=1e-5)
@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from src.utils.artifacts import (MANIFEST_NAME, build_neighbor_index, extend_neighbor_index, get_artifacts,
+                                 neighbor_index_from_vectors, save_artifacts)
+
+
+def catalog_movies(n):
+    return pd.DataFrame({'movie_id': np.arange(100, 100 + n), 'title': [f"Movie {i}" for i in range(n)]})
+
+
+def random_similarity(n, seed=0):
+    vectors = np.random.default_rng(seed).random((n, 8))
+    return vectors @ vectors.T
+
+
+# Gives the manifest a new mtime, so the next lookup cannot take the stat()
+# shortcut even when the rewrite landed in the same clock tick
+def touch_manifest(out_dir, step):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + step * 1_000_000_000))
+
+
+@pytest.fixture
+def out_dir(tmp_path):
+    save_artifacts(catalog_movies(12), build_neighbor_index(random_similarity(12), k=5), str(tmp_path))
+    return str(tmp_path)
+
+
+def test_artifacts_are_loaded_once(out_dir):
+    assert get_artifacts(out_dir) is get_artifacts(out_dir)
+
+
+def test_rewriting_the_same_artifacts_keeps_them(out_dir):
+    artifacts = get_artifacts(out_dir)
+    save_artifacts(catalog_movies(12), build_neighbor_index(random_similarity(12), k=5), out_dir)
+    touch_manifest(out_dir, 1)
+    assert get_artifacts(out_dir) is artifacts
+
+
+def test_new_artifacts_are_reloaded(out_dir):
+    artifacts = get_artifacts(out_dir)
+    save_artifacts(catalog_movies(12), build_neighbor_index(random_similarity(12, seed=1), k=5), out_dir)
+    touch_manifest(out_dir, 1)
+    reloaded = get_artifacts(out_dir)
+    assert reloaded is not artifacts
+    assert get_artifacts(out_dir) is reloaded
+
+
+def random_vectors(n, features=30, seed=0):
+    vectors = np.random.default_rng(seed).random((n, features))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+# Symmetric similarities with many exact ties
+def tied_similarity(n, seed=0):
+    counts = np.random.default_rng(seed).integers(0, 3, size=(n, 6)).astype(np.float64)
+    return counts @ counts.T
+
+
+def assert_same_index(index, expected):
+    assert index['k'] == expected['k']
+    assert (index['ids'] == expected['ids']).all()
+    np.testing.assert_allclose(index['scores'], expected['scores'], rtol=1e-6)
+
+
+@pytest.mark.parametrize('similarity', [
+    random_vectors(60) @ random_vectors(60).T,
+    tied_similarity(60),
+], ids=['distinct', 'ties'])
+@pytest.mark.parametrize('added', [1, 7])
+def test_extend_matches_a_full_rebuild(similarity, added):
+    n = len(similarity) - added
+    index, changed = extend_neighbor_index(build_neighbor_index(similarity[:n, :n], k=10), similarity[n:])
+    expected = build_neighbor_index(similarity, k=10)
+    assert_same_index(index, expected)
+
+    before = build_neighbor_index(similarity[:n, :n], k=10)['ids']
+    assert set(np.flatnonzero((expected['ids'][:n] != before).any(axis=1))) <= set(changed)
+
+
+def test_blocked_build_matches_the_dense_one():
+    vectors = random_vectors(50)
+    expected = build_neighbor_index(vectors @ vectors.T, k=8)
+    for matrix in (vectors, sparse.csr_matrix(vectors)):
+        index = neighbor_index_from_vectors(matrix, k=8, block_rows=7, block_columns=11)
+        assert_same_index(index, expected)
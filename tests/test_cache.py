@@ -0,0 +1,74 @@
+import pytest
+
+from src.utils.cache import DETAILS, MISS, POSTER, LRUCache, MetadataStore, TieredStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MetadataStore(str(tmp_path / 'cache.sqlite'))
+
+
+def test_round_trip(store):
+    store.set(DETAILS, 7, {'title': 'Heat', 'cast': ['Al Pacino']}, ttl=60)
+    assert store.get(DETAILS, 7) == {'title': 'Heat', 'cast': ['Al Pacino']}
+    assert store.get(POSTER, 7) is MISS
+    assert store.get(DETAILS, 8) is MISS
+
+
+def test_negative_entries_are_hits(store):
+    store.set(POSTER, 7, None, ttl=60)
+    assert store.get(POSTER, 7) is None
+
+
+def test_get_many_leaves_misses_out(store):
+    store.set_many(POSTER, {1: 'a.jpg', 2: None, 3: 'c.jpg'}, ttl=60)
+    assert store.get_many(POSTER, [1, 2, 4]) == {1: 'a.jpg', 2: None}
+    assert store.get_many(POSTER, []) == {}
+
+
+def test_expired_entries_miss(store):
+    store.set(POSTER, 7, 'old.jpg', ttl=-1)
+    assert store.get(POSTER, 7) is MISS
+    store.purge_expired()
+    store.set(POSTER, 7, 'new.jpg', ttl=60)
+    assert store.get(POSTER, 7) == 'new.jpg'
+
+
+def test_entries_outlive_the_store(tmp_path):
+    MetadataStore(str(tmp_path / 'cache.sqlite')).set(POSTER, 7, 'a.jpg', ttl=60)
+    assert MetadataStore(str(tmp_path / 'cache.sqlite')).get(POSTER, 7) == 'a.jpg'
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = LRUCache(max_entries=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'b' is now the oldest
+    cache.set('c', 3)
+    assert cache.get('b') is MISS
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert len(cache) == 2
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire():
+    cache = LRUCache(ttl=60)
+    cache.set('a', 1, ttl=0)
+    cache.set('b', None)
+    assert cache.get('a') is MISS
+    assert cache.get('b') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['expirations']) == (1, 1, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_memory_is_filled_from_the_durable_tier(store):
+    store.set(POSTER, 1, 'a.jpg', ttl=60)
+    memory = LRUCache()
+    tiered = TieredStore(memory, store)
+    assert tiered.get_many(POSTER, [1, 2]) == {1: 'a.jpg'}
+    assert memory.get((POSTER, 1)) == 'a.jpg'
+
+    tiered.set(POSTER, 2, None, ttl=60)
+    assert memory.get((POSTER, 2)) is None
+    assert store.get(POSTER, 2) is None
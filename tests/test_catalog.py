@@ -0,0 +1,32 @@
+import pandas as pd
+
+from src.utils.catalog import MovieCatalog
+
+
+# Titles repeat across movies, and the build's merge on title can repeat a
+# movie_id as well
+def catalog():
+    return MovieCatalog(pd.DataFrame({
+        'movie_id': [10, 20, 30, 20],
+        'title': ['Heat', 'Up', 'Heat', 'Up'],
+    }))
+
+
+def test_duplicate_titles_keep_every_row():
+    movies = catalog()
+    assert movies.rows_for_title('Heat') == (0, 2)
+    assert movies.row_for_title('Heat') == 0
+    assert movies.is_ambiguous('Heat')
+    assert movies.rows_for_title('Nope') == ()
+    assert movies.row_for_title('Nope') is None
+
+
+def test_ids_resolve_to_their_first_row():
+    movies = catalog()
+    assert movies.row_for_id(30) == 2
+    assert movies.row_for_id(20) == 1
+    assert movies.row_for_id(99) is None
+
+
+def test_rows_for_titles_and_ids():
+    assert catalog().rows_for(['Heat', 30, 'Nope', 99, 'Up']).tolist() == [0, 2, -1, -1, 1]
@@ -0,0 +1,40 @@
+import numpy as np
+from scipy import sparse
+
+from src.build import fit_embeddings
+from src.utils.embeddings import EmbeddingIndex, project
+from src.utils.ranking import top_k
+
+
+def counts(n=200, features=120, seed=0, empty=()):
+    dense = np.random.default_rng(seed).poisson(0.1, size=(n, features)).astype(np.float64)
+    dense[list(empty)] = 0
+    return sparse.csr_matrix(dense)
+
+
+def test_projection_reproduces_the_fitted_embeddings():
+    vectors = counts()
+    embeddings, idf, components = fit_embeddings(vectors, dim=16)
+    assert embeddings.shape == (200, 16) and embeddings.dtype == np.float32
+    np.testing.assert_allclose(project(vectors, idf, components), embeddings, atol=1e-5)
+
+
+def test_embeddings_are_unit_length_or_zero():
+    vectors = counts(empty=[5])
+    _, idf, components = fit_embeddings(vectors, dim=16)
+    embeddings = project(vectors, idf, components)
+    norms = np.linalg.norm(embeddings, axis=1)
+    assert norms[5] == 0
+    np.testing.assert_allclose(np.delete(norms, 5), 1, rtol=1e-5)
+    # Scaling a row (say, L2-normalizing its counts) does not move it
+    np.testing.assert_allclose(project(vectors[:3] * 4, idf, components), embeddings[:3], atol=1e-6)
+
+
+def test_neighbors_match_a_full_product():
+    embeddings = np.random.default_rng(0).standard_normal((150, 16)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    rows = np.array([0, 7, 149])
+    ids, scores = EmbeddingIndex(embeddings).neighbors(rows, 10)
+    expected_ids, expected_scores = top_k(embeddings[rows].astype(np.float64) @ embeddings.T, 10, exclude=rows)
+    assert (ids == expected_ids).all()
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-5)
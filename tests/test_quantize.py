@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from src.utils.quantize import QUANTIZATIONS, dequantize, quantize_csr, quantize_rows
+
+
+@pytest.fixture
+def rows():
+    rows = np.random.default_rng(0).standard_normal((20, 16)).astype(np.float32)
+    rows[3] = 0  # all-zero rows must survive
+    return rows
+
+
+@pytest.mark.parametrize('quantization, dtype', [('float32', np.float32), ('float16', np.float16), ('int8', np.int8)])
+def test_storage_types(rows, quantization, dtype):
+    values, scales = quantize_rows(rows, quantization)
+    assert values.dtype == dtype
+    assert (scales is not None) == (quantization == 'int8')
+
+
+def test_int8_error_is_half_a_step(rows):
+    values, scales = quantize_rows(rows, 'int8')
+    error = np.abs(dequantize(values, scales) - rows)
+    assert (error <= scales[:, np.newaxis] / 2 + 1e-7).all()
+    assert np.abs(values).max() == 127
+    assert scales[3] == 1 and (values[3] == 0).all()
+
+
+def test_float16_error(rows):
+    values, _ = quantize_rows(rows, 'float16')
+    np.testing.assert_allclose(dequantize(values), rows, rtol=1e-3)
+
+
+@pytest.mark.parametrize('quantization', QUANTIZATIONS)
+def test_requantizing_is_idempotent(rows, quantization):
+    values, scales = quantize_rows(rows, quantization)
+    again, again_scales = quantize_rows(dequantize(values, scales), quantization)
+    assert (again == values).all()
+    if scales is not None:
+        np.testing.assert_array_equal(again_scales, scales)
+
+
+@pytest.mark.parametrize('quantization', QUANTIZATIONS)
+def test_csr_rows_match_dense_rows(quantization):
+    dense = np.array([[0.5, 0, -1.0], [0, 0, 0], [0.25, 0.75, 0]], dtype=np.float32)
+    indptr = np.array([0, 2, 2, 4])
+    data = np.array([0.5, -1.0, 0.25, 0.75], dtype=np.float32)
+    values, scales = quantize_csr(data, indptr, quantization)
+    restored = dequantize(values, scales, None if scales is None else np.diff(indptr))
+
+    dense_values, dense_scales = quantize_rows(dense, quantization)
+    expected = dequantize(dense_values, dense_scales)[dense != 0]
+    np.testing.assert_array_equal(restored, expected)
@@ -0,0 +1,48 @@
+import numpy as np
+
+from src.utils.ranking import top_k
+
+
+def test_best_first():
+    ids, scores = top_k([0.1, 0.9, 0.5, 0.7], 3)
+    assert ids.tolist() == [1, 3, 2]
+    assert scores.tolist() == [0.9, 0.7, 0.5]
+
+
+def test_ties_go_to_the_lowest_id():
+    ids, _ = top_k([0.5, 0.9, 0.5, 0.5, 0.9], 4)
+    assert ids.tolist() == [1, 4, 0, 2]
+
+
+def test_ties_at_the_cutoff():
+    ids, _ = top_k([0.3, 0.5, 0.5, 0.5, 0.1], 2)
+    assert ids.tolist() == [1, 2]
+
+
+def test_exclude():
+    ids, _ = top_k([0.1, 0.9, 0.5], 2, exclude=1)
+    assert ids.tolist() == [2, 0]
+
+
+def test_k_larger_than_the_candidates():
+    ids, scores = top_k([0.2, 0.8, 0.4], 10, exclude=0)
+    assert ids.tolist() == [1, 2]
+    assert scores.tolist() == [0.8, 0.4]
+
+
+def test_rows_with_their_own_exclusions():
+    scores = np.array([[1.0, 0.3, 0.3, 0.2],
+                       [0.3, 1.0, 0.6, 0.6],
+                       [0.3, 0.6, 1.0, 0.1]])
+    ids, top_scores = top_k(scores, 2, exclude=[0, 1, 2])
+    assert ids.tolist() == [[1, 2], [2, 3], [1, 0]]
+    assert top_scores.tolist() == [[0.3, 0.3], [0.6, 0.6], [0.6, 0.3]]
+
+
+# Same answer as a full stable sort on (-score, id)
+def test_matches_a_full_sort():
+    rng = np.random.default_rng(0)
+    scores = rng.integers(0, 5, size=(50, 40)).astype(np.float64)
+    ids, _ = top_k(scores, 7)
+    expected = np.argsort(-scores, axis=1, kind='stable')[:, :7]
+    assert (ids == expected).all()
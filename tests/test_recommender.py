@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.artifacts import build_neighbor_index, load_artifacts, save_artifacts
+from src.utils.recommender import recommend_many
+
+TITLES = ['Alien', 'Aliens', 'Heat', 'Up', 'Brazil', 'Fargo']
+
+
+@pytest.fixture(scope='module')
+def artifacts(tmp_path_factory):
+    out_dir = str(tmp_path_factory.mktemp('artifacts'))
+    vectors = np.random.default_rng(0).random((len(TITLES), 5))
+    movies = pd.DataFrame({'movie_id': [10, 20, 30, 40, 50, 60], 'title': TITLES})
+    neighbors = build_neighbor_index(vectors @ vectors.T, k=4)
+    save_artifacts(movies, neighbors, out_dir)
+    return load_artifacts(out_dir), neighbors
+
+
+def test_rows_match_the_neighbor_index(artifacts):
+    loaded, neighbors = artifacts
+    result = recommend_many(['Heat', 40, 'Alien'], k=3, artifacts=loaded)
+    assert result.found.tolist() == [True, True, True]
+    np.testing.assert_array_equal(result.rows, neighbors['ids'][[2, 3, 0], :3])
+    np.testing.assert_allclose(result.scores, neighbors['scores'][[2, 3, 0], :3])
+    np.testing.assert_array_equal(result.movie_ids, (result.rows + 1) * 10)
+
+
+def test_unknown_seeds_are_padded(artifacts):
+    loaded, _ = artifacts
+    result = recommend_many(['Nope', 30, 999], k=2, artifacts=loaded)
+    assert result.seeds == ['Nope', 30, 999]
+    assert result.found.tolist() == [False, True, False]
+    assert (result.rows[[0, 2]] == -1).all() and (result.movie_ids[[0, 2]] == -1).all()
+    assert np.isnan(result.scores[[0, 2]]).all()
+
+
+def test_k_is_capped_by_the_index(artifacts):
+    loaded, _ = artifacts
+    with pytest.raises(ValueError):
+        recommend_many(['Heat'], k=5, artifacts=loaded)
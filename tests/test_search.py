@@ -0,0 +1,50 @@
+import pytest
+
+from src.utils.search import ALL_WORDS, EXACT, FUZZY, PREFIX, SUBSTRING, WORD_PREFIX, TitleIndex
+
+TITLES = [
+    'The Dark Knight', 'The Dark Knight Rises', 'Batman', 'Batman Begins', 'Dark Shadows',
+    'Knight and Day', 'Star Wars', 'Lone Star', 'Superstar', 'Iron Man', 'Man of Steel', 'Mandela',
+]
+
+
+@pytest.fixture(scope='module')
+def index():
+    return TitleIndex(TITLES)
+
+
+def ranked(index, query, limit=None):
+    return [(tier, index.keys[i]) for tier, i in index.matches(query, limit)]
+
+
+def test_tiers(index):
+    assert ranked(index, 'batman') == [(EXACT, 'batman'), (PREFIX, 'batman begins')]
+    assert ranked(index, 'man') == [
+        (PREFIX, 'man of steel'), (PREFIX, 'mandela'), (WORD_PREFIX, 'iron man'),
+        (SUBSTRING, 'batman'), (SUBSTRING, 'batman begins'),
+    ]
+    assert ranked(index, 'knight dark') == [
+        (ALL_WORDS, 'the dark knight'), (ALL_WORDS, 'the dark knight rises'),
+    ]
+
+
+def test_queries_are_normalized(index):
+    assert ranked(index, '  STAR   wars ') == [(EXACT, 'star wars')]
+
+
+@pytest.mark.parametrize('query', ['man', 'star', 'dark', 'a', 'knight dark'])
+def test_limit_keeps_the_best_matches(index, query):
+    matches = index.matches(query)
+    for limit in range(1, len(matches) + 2):
+        assert index.matches(query, limit) == matches[:limit]
+
+
+def test_typos_fall_back_to_fuzzy_matching(index):
+    assert index.matches('dakr knigt') == []
+    assert [TITLES[row] for row in index.search('dakr knigt')] == ['The Dark Knight', 'The Dark Knight Rises']
+    assert index.fuzzy_matches('dakr knigt')[0][0] == FUZZY
+    assert index.search('dakr knigt', fuzzy=False) == []
+
+
+def test_duplicate_titles_return_every_row():
+    assert TitleIndex(['Heat', 'Up', 'Heat']).search('heat') == [0, 2]
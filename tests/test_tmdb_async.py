@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import pytest
+
+from src.utils import cache, tmdb_async
+from src.utils.cache import MISS, POSTER, POSTER_TTL, LRUCache, MetadataStore, TieredStore
+from src.utils.providers import MetadataProvider
+from src.utils.tmdb import poster_url
+from src.utils.tmdb_async import AsyncTMDBClient, poster_stream
+
+
+# Posters for every movie except those in `failing` (errors) and `slow`
+# (answers after `delay` seconds); counts the requests per movie
+class FakeProvider(MetadataProvider):
+    name = 'fake'
+
+    def __init__(self, failing=(), slow=(), delay=1.0):
+        self.failing = set(failing)
+        self.slow = set(slow)
+        self.delay = delay
+        self.requests = {}
+
+    async def movie(self, movie_id):
+        self.requests[movie_id] = self.requests.get(movie_id, 0) + 1
+        if movie_id in self.slow:
+            await asyncio.sleep(self.delay)
+        if movie_id in self.failing:
+            raise ConnectionError(f"movie {movie_id}")
+        return {'id': movie_id, 'poster_path': f"/{movie_id}.jpg"}
+
+    async def credits(self, movie_id):
+        return {'id': movie_id, 'cast': [], 'crew': []}
+
+
+def poster(movie_id):
+    return poster_url({'poster_path': f"/{movie_id}.jpg"})
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TieredStore(LRUCache(), MetadataStore(str(tmp_path / 'cache.sqlite')))
+
+
+def stream(client, movie_ids, **options):
+    reported = []
+    asyncio.run(client.stream_posters(movie_ids, lambda index, poster: reported.append((index, poster)),
+                                      **options))
+    return reported
+
+
+def test_every_position_is_reported_once(store):
+    store.set(POSTER, 1, poster(1), POSTER_TTL)
+    provider = FakeProvider(failing=[3])
+    reported = stream(AsyncTMDBClient(provider, store=store), [1, 2, 2, 3], default=None)
+
+    assert reported[0] == (0, poster(1))  # cached posters come first
+    assert sorted(reported) == [(0, poster(1)), (1, poster(2)), (2, poster(2)), (3, None)]
+    assert provider.requests == {2: 1, 3: 1}
+
+
+def test_failed_posters_are_asked_for_again(store):
+    provider = FakeProvider(failing=[3])
+    client = AsyncTMDBClient(provider, store=store)
+    stream(client, [2, 3])
+    assert store.get(POSTER, 2) == poster(2)
+    assert store.get(POSTER, 3) is MISS
+
+    provider.failing.clear()
+    assert sorted(stream(client, [2, 3])) == [(0, poster(2)), (1, poster(3))]
+    assert provider.requests == {2: 1, 3: 2}
+
+
+def test_stragglers_get_the_default(store):
+    provider = FakeProvider(slow=[4])
+    reported = stream(AsyncTMDBClient(provider, store=store), [4, 5], timeout=0.2, default='late')
+    assert reported == [(1, poster(5)), (0, 'late')]
+    assert store.get(POSTER, 4) is MISS
+
+
+def test_poster_stream_runs_before_it_is_drained(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the facades' store lives in ./artifacts
+    monkeypatch.setattr(cache, '_stores', {})
+    monkeypatch.setattr(tmdb_async, '_clients', {})
+    provider = FakeProvider()
+    arrivals = poster_stream([6, 7], provider=provider)
+    for _ in range(100):
+        if len(provider.requests) == 2:
+            break
+        time.sleep(0.01)
+    assert provider.requests == {6: 1, 7: 1}
+    assert sorted(arrivals) == [(0, poster(6)), (1, poster(7))]